@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+导入性能基准 - Data Analysis WebUI
+
+用 create_test_data.py 生成各形态的合成数据，逐项计时 load_excel、日期列识别、
+按唯一值拆分列（parse_table_columns_from_df），并记录峰值内存，结果写为 JSON。
+使用方法: python3 benchmark_ingest.py --scale 0.1 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from create_test_data import SYNTHETIC_SHAPES, build_synthetic_frame, write_frame
+
+# tall 默认 100 万行，超出 xlsx 行数上限，默认写为 csv
+_DEFAULT_FORMATS = {"tall": ".csv"}
+
+
+def _timed(func, repeat: int):
+    """重复执行 repeat 次，返回 (最后一次结果, 各次耗时秒数)。"""
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+    return result, seconds
+
+
+def _peak_mb(func) -> float:
+    """单独执行一次并用 tracemalloc 统计 Python 侧峰值分配（计时运行不开启，避免拖慢）。"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 2)
+
+
+def _summary(seconds):
+    return {
+        "min": round(min(seconds), 4),
+        "median": round(statistics.median(seconds), 4),
+        "runs": [round(s, 4) for s in seconds],
+    }
+
+
+def prepare_dataset(shape: str, data_dir: Path, scale: float, fmt: str = None, seed: int = 0) -> Path:
+    """生成（或复用已存在的）合成数据文件。"""
+    rows, cols = SYNTHETIC_SHAPES[shape]
+    rows = max(10, int(rows * scale))
+    suffix = fmt or _DEFAULT_FORMATS.get(shape, ".xlsx")
+    path = data_dir / f"{shape}_{rows}x{cols}_s{seed}{suffix}"
+    if not path.exists():
+        write_frame(build_synthetic_frame(shape, rows=rows, cols=cols, seed=seed), str(path))
+    return path
+
+
+def benchmark_file(path: Path, has_time_column: bool, repeat: int, measure_memory: bool) -> dict:
+    from src.excel_parser import _detect_date_column, load_excel, profile_columns
+    from src.table_preprocess import parse_table_columns_from_df, read_table
+
+    raw = read_table(str(path))
+    parsed, load_seconds = _timed(lambda: load_excel(str(path), has_time_column=has_time_column), repeat)
+    (date_col, _), detect_seconds = _timed(lambda: _detect_date_column(raw, profile_columns(raw)), repeat)
+    (location_cols, value_cols), split_seconds = _timed(lambda: parse_table_columns_from_df(raw), repeat)
+
+    result = {
+        "file": path.name,
+        "file_bytes": path.stat().st_size,
+        "rows": int(len(parsed.df)),
+        "cols": int(raw.shape[1]),
+        "reader_engine": parsed.reader_engine,
+        "read_seconds": round(parsed.read_seconds, 4) if parsed.read_seconds is not None else None,
+        "load_excel_seconds": _summary(load_seconds),
+        "detect_date_column_seconds": _summary(detect_seconds),
+        "parse_table_columns_seconds": _summary(split_seconds),
+        "date_column": parsed.date_column,
+        "detected_date_column": str(date_col),
+        "numeric_columns": len(parsed.numeric_columns),
+        "location_columns": len(location_cols),
+        "value_columns": len(value_cols),
+    }
+    if measure_memory:
+        result["load_excel_peak_mb"] = _peak_mb(lambda: load_excel(str(path), has_time_column=has_time_column))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="导入性能基准：合成数据 × load_excel / 日期列识别 / 列拆分",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  %(prog)s                                   # 全部形态，默认规模
+  %(prog)s --scale 0.05 --repeat 3           # 缩小到 5%% 规模，每项重复 3 次
+  %(prog)s --shapes wide semiconductor --format .parquet --output bench.json
+        """
+    )
+    parser.add_argument('--shapes', nargs='+', choices=sorted(SYNTHETIC_SHAPES), default=sorted(SYNTHETIC_SHAPES),
+                        help='参与基准的数据形态（默认全部）')
+    parser.add_argument('--scale', type=float, default=1.0, help='行数缩放比例（默认 1.0）')
+    parser.add_argument('--format', choices=['.xlsx', '.csv', '.parquet'], default=None,
+                        help='数据文件格式（默认 xlsx，tall 为 csv）')
+    parser.add_argument('--repeat', type=int, default=1, help='每项计时重复次数，取最小值/中位数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--data-dir', default=None, help='合成数据目录（默认系统临时目录，已存在的文件直接复用）')
+    parser.add_argument('--output', '-o', default=None, help='结果 JSON 路径（默认只打印到标准输出）')
+    parser.add_argument('--no-memory', action='store_true', help='跳过 tracemalloc 峰值内存测量')
+    args = parser.parse_args()
+
+    # 基准只测解析本身，不读写快照
+    os.environ.setdefault("DATA_ANALYSIS_SNAPSHOT_DIR", "off")
+    data_dir = Path(args.data_dir or Path(tempfile.gettempdir()) / "data_analysis_bench")
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for shape in args.shapes:
+        path = prepare_dataset(shape, data_dir, args.scale, args.format, args.seed)
+        print(f"⏱️  {shape}: {path.name}", file=sys.stderr)
+        entry = benchmark_file(path, shape != "semiconductor", max(1, args.repeat), not args.no_memory)
+        entry["shape"] = shape
+        results.append(entry)
+        print(f"   load_excel {entry['load_excel_seconds']['min']}s（{entry['reader_engine']}），"
+              f"峰值 {entry.get('load_excel_peak_mb', '-')} MB", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        print(f"✅ 结果已写入: {Path(args.output).absolute()}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,9 @@
 """
 测试数据生成器 - Data Analysis WebUI
 
-生成包含日期和多个数值指标的 Excel 测试文件。
-使用方法: python3 create_test_data.py
+生成包含日期和多个数值指标的 Excel 测试文件，以及用于性能基准的合成数据集
+（tall / wide / semiconductor / units / mixed_dates，见 SYNTHETIC_SHAPES）。
+使用方法: python3 create_test_data.py [--shape tall --rows 1000000 --output tall.csv]
 """
 
 import sys
@@ -92,6 +93,114 @@ def generate_test_excel(output_file: str = "test_data.xlsx", days: int = 365):
     return str(output_path.absolute())
 
 
+# 合成数据集形态及默认规模（行数, 指标列数）
+SYNTHETIC_SHAPES = {
+    "tall": (1_000_000, 5),         # 超长烤机日志：分钟级时间戳 + 少量指标
+    "wide": (2_000, 500),           # 宽表：500+ 参数列，列名带单位
+    "semiconductor": (50_000, 20),  # 晶圆测试：lot/wafer/die/x/y 定位列 + 参数列，无时间列
+    "units": (10_000, 10),          # 首行为「单位」标记行
+    "mixed_dates": (10_000, 5),     # 文本日期列混合多种格式
+}
+
+_SEMI_PARAMS = [("Vth", "mV"), ("Idsat", "uA"), ("Ioff", "pA"), ("Ron", "ohm"), ("BV", "V")]
+
+
+def build_synthetic_frame(shape: str, rows: int = None, cols: int = None, seed: int = 0):
+    """按形态构造合成 DataFrame（numpy 向量化生成，百万行也只需数秒）。"""
+    import numpy as np
+    import pandas as pd
+
+    if shape not in SYNTHETIC_SHAPES:
+        raise ValueError(f"未知数据形态: {shape}，可选 {sorted(SYNTHETIC_SHAPES)}")
+    default_rows, default_cols = SYNTHETIC_SHAPES[shape]
+    rows = rows or default_rows
+    cols = cols or default_cols
+    rng = np.random.default_rng(seed)
+
+    def metrics(names):
+        base = rng.uniform(10, 1000, size=len(names))
+        values = base + rng.normal(0, 1, size=(rows, len(names))) * base * 0.05
+        return {name: np.round(values[:, i], 3) for i, name in enumerate(names)}
+
+    if shape == "tall":
+        data = {"测试时间": pd.date_range("2024-01-01", periods=rows, freq="min")}
+        data.update(metrics([f"指标{i + 1}" for i in range(cols)]))
+        return pd.DataFrame(data)
+
+    if shape == "wide":
+        data = {"日期": pd.date_range("2024-01-01", periods=rows, freq="h")}
+        units = ["mV", "mA", "%", "V", "ohm"]
+        data.update(metrics([f"参数{i + 1} ({units[i % len(units)]})" for i in range(cols)]))
+        return pd.DataFrame(data)
+
+    if shape == "semiconductor":
+        dies_per_wafer = 500
+        wafers_per_lot = 25
+        index = np.arange(rows)
+        die = index % dies_per_wafer
+        wafer = (index // dies_per_wafer) % wafers_per_lot + 1
+        lot = index // (dies_per_wafer * wafers_per_lot)
+        side = int(np.ceil(np.sqrt(dies_per_wafer)))
+        data = {
+            "lot": np.array([f"LOT{n:04d}" for n in range(lot.max() + 1)])[lot],
+            "wafer": wafer,
+            "die": die,
+            "x": die % side,
+            "y": die // side,
+        }
+        names = [f"{_SEMI_PARAMS[i % len(_SEMI_PARAMS)][0]}_{i // len(_SEMI_PARAMS) + 1} "
+                 f"({_SEMI_PARAMS[i % len(_SEMI_PARAMS)][1]})" for i in range(cols)]
+        data.update(metrics(names))
+        data["bin"] = rng.choice([1, 1, 1, 1, 2, 3, 7], size=rows)
+        return pd.DataFrame(data)
+
+    if shape == "units":
+        names = [f"指标{i + 1}" for i in range(cols)]
+        body = pd.DataFrame({"日期": pd.date_range("2024-01-01", periods=rows, freq="D"), **metrics(names)})
+        unit_row = {"日期": None, **{name: ["kg", "t", "%", "元"][i % 4] for i, name in enumerate(names)}}
+        unit_row[names[0]] = "单位"
+        head = pd.DataFrame([unit_row])
+        return pd.concat([head.astype(object), body.astype(object)], ignore_index=True)
+
+    # mixed_dates：同一列中混合 YYYY-MM-DD / YYYY/MM/DD / YYYYMMDD 三种文本格式
+    dates = pd.date_range("2020-01-01", periods=rows, freq="D")
+    formats = np.array(["%Y-%m-%d", "%Y/%m/%d", "%Y%m%d"])
+    choice = rng.integers(0, len(formats), size=rows)
+    text = np.empty(rows, dtype=object)
+    for i, fmt in enumerate(formats):
+        mask = choice == i
+        text[mask] = dates[mask].strftime(str(fmt))
+    data = {"日期": text}
+    data.update(metrics([f"指标{i + 1}" for i in range(cols)]))
+    return pd.DataFrame(data)
+
+
+def write_frame(df, output_file: str) -> str:
+    """按扩展名写出 .xlsx / .csv / .parquet；xlsx 受 1,048,576 行上限约束。"""
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    suffix = output_path.suffix.lower()
+    if suffix == ".csv":
+        df.to_csv(output_path, index=False)
+    elif suffix == ".parquet":
+        df.astype({c: str for c in df.columns if df[c].dtype == object}).to_parquet(output_path, index=False)
+    elif suffix in {".xlsx", ".xlsm"}:
+        if len(df) >= 1_048_576:
+            raise ValueError("xlsx 单个工作表最多 1,048,575 行数据，请改用 .csv 或 .parquet")
+        df.to_excel(output_path, index=False)
+    else:
+        raise ValueError(f"不支持的输出格式: {suffix}")
+    return str(output_path.absolute())
+
+
+def generate_synthetic_dataset(shape: str, output_file: str, rows: int = None, cols: int = None, seed: int = 0) -> str:
+    """生成指定形态的合成数据文件，返回绝对路径。"""
+    df = build_synthetic_frame(shape, rows=rows, cols=cols, seed=seed)
+    path = write_frame(df, output_file)
+    print(f"✅ 合成数据已创建: {path}（{shape}，{len(df)} 行 × {len(df.columns)} 列）")
+    return path
+
+
 def main():
     """主函数"""
     import argparse
@@ -105,6 +214,8 @@ def main():
   %(prog)s --days 730               # 生成2年的数据
   %(prog)s --output sales_test.xlsx  # 指定输出文件名
   %(prog)s --days 180 --output q1_2024.xlsx  # 自定义天数和文件名
+  %(prog)s --shape tall --output tall.csv    # 100 万行烤机日志（csv/parquet 不受 xlsx 行数上限限制）
+  %(prog)s --shape semiconductor --rows 12500 --output wafer.xlsx
         """
     )
 
@@ -121,8 +232,27 @@ def main():
         help='生成数据的天数（默认: 365）'
     )
 
+    parser.add_argument(
+        '--shape', '-s',
+        choices=['daily'] + sorted(SYNTHETIC_SHAPES),
+        default='daily',
+        help='数据形态（默认 daily：按天的 5 指标示例数据）'
+    )
+
+    parser.add_argument('--rows', type=int, default=None, help='合成数据行数（默认取形态的默认规模）')
+    parser.add_argument('--cols', type=int, default=None, help='合成数据指标列数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+
     args = parser.parse_args()
 
+    if args.shape != 'daily':
+        try:
+            generate_synthetic_dataset(args.shape, args.output, rows=args.rows, cols=args.cols, seed=args.seed)
+        except Exception as e:
+            print(f"❌ 生成数据时出错: {e}")
+            sys.exit(1)
+        return
+
     # 验证参数
     if args.days <= 0:
         print("❌ 错误: 天数必须大于 0")
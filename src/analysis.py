@@ -8,9 +8,14 @@ from typing import Dict, List, Optional, Tuple
 
 import matplotlib.pyplot as plt
 from matplotlib import font_manager
+import numpy as np
 import pandas as pd
 
 
+# 相关性搜索的行数上限，超过时随机抽样（相关系数的抽样误差约 1/sqrt(行数)）。
+CORRELATION_MAX_ROWS = 200_000
+
+
 def _configure_plot_fonts() -> None:
     # 优先使用项目 fonts 目录：英文 Times New Roman，汉字 宋体
     _fonts_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fonts")
@@ -138,7 +143,8 @@ def compute_stats(series: pd.Series) -> Dict[str, float]:
         outlier_ratio = float(((series < lower) | (series > upper)).mean())
 
     if len(series) > 1:
-        x = pd.Series(range(len(series)), dtype="float64")
+        # x 与 series 共用索引，按位置配对（窗口过滤/dropna 后索引不从 0 开始）
+        x = pd.Series(range(len(series)), index=series.index, dtype="float64")
         x_mean = float(x.mean())
         y = series.astype("float64")
         y_mean = float(y.mean())
@@ -203,20 +209,89 @@ def summarize_no_time_dataset(df: pd.DataFrame, metrics: List[str]) -> str:
     if missing_parts:
         lines.append("；".join(missing_parts) + "。")
 
-    numeric_df = df[metrics].apply(pd.to_numeric, errors="coerce")
-    corr = numeric_df.corr(numeric_only=True)
-    best_pair = None
-    best_val = 0.0
-    if corr is not None and not corr.empty:
-        cols = list(corr.columns)
-        for i in range(len(cols)):
-            for j in range(i + 1, len(cols)):
-                val = corr.iloc[i, j]
-                if pd.notna(val) and abs(float(val)) > abs(best_val):
-                    best_val = float(val)
-                    best_pair = (cols[i], cols[j])
-    if best_pair:
-        direction = "正相关" if best_val >= 0 else "负相关"
-        lines.append(f"相关性最显著的指标对为 {best_pair[0]} 与 {best_pair[1]}（{direction}，系数 {best_val:.3f}）。")
+    pairs, sampled_rows = top_correlated_pairs(df, metrics, top_k=3)
+    if pairs:
+        parts = [
+            f"{a} 与 {b}（{'正相关' if val >= 0 else '负相关'}，系数 {val:.3f}）"
+            for a, b, val in pairs
+        ]
+        sample_note = f"（基于 {sampled_rows} 条抽样）" if sampled_rows else ""
+        lines.append(f"相关性最显著的指标对{sample_note}：" + "；".join(parts) + "。")
 
     return "\n".join(lines)
+
+
+def _pairwise_corr(values: np.ndarray) -> np.ndarray:
+    """按列两两成对的有效行计算 Pearson 相关矩阵（与 DataFrame.corr 的缺失值处理一致），全部为矩阵乘法。"""
+    valid = ~np.isnan(values)
+    if valid.all():
+        centered = values - values.mean(axis=0)
+        norms = np.sqrt((centered * centered).sum(axis=0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = centered / norms
+            corr = z.T @ z
+        corr[:, norms == 0] = np.nan
+        corr[norms == 0, :] = np.nan
+        return np.clip(corr, -1.0, 1.0)
+
+    mask = valid.astype(np.float64)
+    # 先按各列均值平移，降低大均值列的相消误差（相关系数对平移不变）；全空列不平移
+    x = np.where(valid, values, 0.0)
+    column_counts = valid.sum(axis=0)
+    shift = x.sum(axis=0) / np.maximum(column_counts, 1)
+    x = np.where(valid, x - shift, 0.0)
+    count = mask.T @ mask
+    sum_x = x.T @ mask  # [i, j]：列 i 在 (i, j) 同时有效的行上的和
+    sum_xx = (x * x).T @ mask
+    sum_xy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sum_xy - sum_x * sum_x.T / count
+        var_i = sum_xx - sum_x * sum_x / count
+        var_j = var_i.T
+        corr = cov / np.sqrt(var_i * var_j)
+    corr[(count < 2) | (var_i <= 0) | (var_j <= 0)] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def top_correlated_pairs(
+    df: pd.DataFrame,
+    metrics: List[str],
+    top_k: int = 3,
+    max_rows: int = CORRELATION_MAX_ROWS,
+    seed: int = 0,
+) -> Tuple[List[Tuple[str, str, float]], Optional[int]]:
+    """返回 |相关系数| 最大的 top_k 个指标对 [(列1, 列2, 系数)] 与抽样行数（未抽样为 None）。
+
+    标准化矩阵乘积一次得到全部两两相关，上三角用 argpartition 取前 k，
+    行数超过 max_rows 时按固定种子随机抽样。系数相同时按列顺序靠前者优先。
+    """
+    columns = [m for m in dict.fromkeys(metrics) if m in df.columns]
+    if len(columns) < 2 or top_k <= 0:
+        return [], None
+    frame = df[columns]
+    sampled_rows = None
+    if max_rows and len(frame) > max_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(len(frame), size=max_rows, replace=False))
+        frame = frame.iloc[rows]
+        sampled_rows = max_rows
+    # 先抽样再逐列转数值，只分配一份 (行, 指标) 矩阵
+    values = np.empty((len(frame), len(columns)), dtype=np.float64)
+    for i, col in enumerate(columns):
+        values[:, i] = pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+    corr = _pairwise_corr(values)
+    upper_i, upper_j = np.triu_indices(len(columns), k=1)
+    scores = np.abs(corr[upper_i, upper_j])
+    candidates = np.flatnonzero(~np.isnan(scores))
+    if candidates.size == 0:
+        return [], sampled_rows
+    if candidates.size > top_k:
+        # 取前 k 的阈值后保留所有 >= 阈值的候选，再按 (|r| 降序, 位置) 稳定排序，保证并列时结果确定
+        kth = np.partition(scores[candidates], candidates.size - top_k)[candidates.size - top_k]
+        candidates = candidates[scores[candidates] >= kth]
+    candidates = candidates[np.lexsort((candidates, -scores[candidates]))][:top_k]
+    pairs = [
+        (columns[upper_i[c]], columns[upper_j[c]], float(corr[upper_i[c], upper_j[c]]))
+        for c in candidates
+    ]
+    return pairs, sampled_rows
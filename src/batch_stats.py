@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.analysis import compute_stats
+
+# 与 compute_stats 返回字典的键顺序一致（报告表格按此顺序输出）。
+STAT_KEYS = (
+    "count",
+    "mean",
+    "min",
+    "max",
+    "start",
+    "end",
+    "abs_change",
+    "pct_change",
+    "median",
+    "std",
+    "p5",
+    "p95",
+    "cv",
+    "outlier_ratio",
+    "drift_slope",
+)
+
+# p5 / q1 / q3 / p95
+_QUANTILES = np.array([0.05, 0.25, 0.75, 0.95])
+# 每批压缩的列数，限制临时矩阵的峰值内存。
+_COLUMN_BATCH = 64
+
+
+def _empty_stats() -> Dict[str, float]:
+    stats: Dict[str, float] = {key: math.nan for key in STAT_KEYS}
+    stats["count"] = 0
+    return stats
+
+
+def _sorted_quantiles(ordered: np.ndarray, qs: np.ndarray) -> np.ndarray:
+    """在已排序的列上按 numpy linear 方法取分位数（与 np.quantile 的插值公式逐位一致，省去 partition）。"""
+    n = ordered.shape[0]
+    virtual = (n - 1) * qs
+    previous = np.floor(virtual).astype(np.intp)
+    following = np.minimum(previous + 1, n - 1)
+    gamma = (virtual - previous)[:, None]
+    lower = ordered[previous]
+    diff = ordered[following] - lower
+    result = lower + diff * gamma
+    upper_half = np.broadcast_to(gamma >= 0.5, result.shape)
+    result[upper_half] = (ordered[following] - diff * (1 - gamma))[upper_half]
+    return result
+
+
+def order_statistics(block: np.ndarray) -> Dict[str, np.ndarray]:
+    """block 为 (n, k) 矩阵，每列 n 个有效值；每列排序一次，返回各列的 min/max/median/p5/p95/outlier_ratio。"""
+    n = block.shape[0]
+    ordered = np.sort(block, axis=0)
+    if n % 2:
+        medians = ordered[n // 2]
+    else:
+        medians = (ordered[n // 2 - 1] + ordered[n // 2]) / 2
+    p5, q1, q3, p95 = _sorted_quantiles(ordered, _QUANTILES)
+    iqr = q3 - q1
+    outside = ((block < (q1 - 1.5 * iqr)) | (block > (q3 + 1.5 * iqr))).sum(axis=0)
+    return {
+        "min": ordered[0],
+        "max": ordered[-1],
+        "median": medians,
+        "p5": p5,
+        "p95": p95,
+        "outlier_ratio": np.where(iqr <= 0, 0.0, outside / n),
+    }
+
+
+def block_moments(block: np.ndarray) -> Dict[str, np.ndarray]:
+    """block 为 (n, k) 的 Fortran 序矩阵（n >= 1），返回各列的均值、标准差与漂移斜率。
+
+    先求均值再对离差求平方和（两遍法），不受数据整体水平影响；
+    逐列沿连续内存做 pairwise 求和，与 pandas 对一维 Series 的求和顺序一致。
+    """
+    n, k = block.shape
+    means = block.sum(axis=0) / n
+    if n > 1:
+        centered = means - block
+        stds = np.sqrt((centered * centered).sum(axis=0) / (n - 1))
+        x = np.arange(n, dtype=np.float64)
+        x -= x.sum() / n
+        denom = float((x * x).sum())
+        slopes = (x[:, None] * (block - means)).sum(axis=0) / denom if denom != 0 else np.zeros(k)
+    else:
+        stds = np.zeros(k)
+        slopes = np.zeros(k)
+    return {"mean": means, "std": stds, "drift_slope": slopes}
+
+
+def _group_stats(block: np.ndarray) -> List[Dict[str, float]]:
+    """block 为 (n, k) 的 Fortran 序矩阵，每列 n 个有效值（原始行序）。
+
+    每列只排序一次，均值/方差共享一次求和（见 block_moments），因此结果与 compute_stats 逐位相同。
+    """
+    n, k = block.shape
+    moments = block_moments(block)
+    means, stds, slopes = moments["mean"], moments["std"], moments["drift_slope"]
+    order = order_statistics(block)
+
+    results = []
+    for j in range(k):
+        start = float(block[0, j])
+        end = float(block[-1, j])
+        mean = float(means[j])
+        std = float(stds[j])
+        abs_change = end - start
+        results.append(
+            {
+                "count": int(n),
+                "mean": mean,
+                "min": float(order["min"][j]),
+                "max": float(order["max"][j]),
+                "start": start,
+                "end": end,
+                "abs_change": abs_change,
+                "pct_change": math.nan if start == 0 else abs_change / start,
+                "median": float(order["median"][j]),
+                "std": std,
+                "p5": float(order["p5"][j]),
+                "p95": float(order["p95"][j]),
+                "cv": math.nan if abs(mean) < 1e-12 else std / mean,
+                "outlier_ratio": float(order["outlier_ratio"][j]),
+                "drift_slope": float(slopes[j]),
+            }
+        )
+    return results
+
+
+def stats_from_block(block: np.ndarray, row_mask: Optional[np.ndarray] = None) -> List[Dict[str, float]]:
+    """对 (行, 指标) 二维 float64 矩阵逐列计算 compute_stats 的全部统计量。
+
+    每列的有效值为非 NaN 且 row_mask 为真的行；有效行数相同的列合并为一个矩阵批量计算。
+    """
+    block = np.asarray(block, dtype=np.float64)
+    if block.ndim != 2:
+        raise ValueError("block 必须为二维矩阵 (行, 指标)")
+    valid = ~np.isnan(block)
+    if row_mask is not None:
+        valid &= np.asarray(row_mask, dtype=bool)[:, None]
+    counts = valid.sum(axis=0)
+    results: List[Optional[Dict[str, float]]] = [None] * block.shape[1]
+    for n in np.unique(counts):
+        cols = np.flatnonzero(counts == n)
+        if n == 0:
+            for j in cols:
+                results[j] = _empty_stats()
+            continue
+        if n == block.shape[0]:
+            # 全部行有效：整块为 Fortran 序时零拷贝
+            compact = block if len(cols) == block.shape[1] else block[:, cols]
+            compact = np.asfortranarray(compact)
+        else:
+            compact = np.empty((int(n), len(cols)), dtype=np.float64, order="F")
+            for i, j in enumerate(cols):
+                compact[:, i] = block[valid[:, j], j]
+        for j, stats in zip(cols, _group_stats(compact)):
+            results[j] = stats
+    return results
+
+
+def compute_stats_batch(
+    df: pd.DataFrame,
+    metrics: Sequence[str],
+    date_col: Optional[str] = None,
+) -> Dict[str, Dict[str, float]]:
+    """批量计算多个指标的统计量，结果与逐列 compute_stats(df[[date_col, m]].dropna()[m]) 一致。
+
+    float64 列按 _COLUMN_BATCH 列一批组成矩阵计算；其他 dtype（整数、compact 模式的 float32）
+    的求和精度与 pandas 不同，逐列回退到 compute_stats 以保证结果不变。
+    """
+    row_mask = df[date_col].notna().to_numpy() if date_col is not None else None
+    results: Dict[str, Dict[str, float]] = {}
+    batch: List[str] = []
+
+    def _flush() -> None:
+        if not batch:
+            return
+        block = np.empty((len(df), len(batch)), dtype=np.float64, order="F")
+        for i, metric in enumerate(batch):
+            block[:, i] = df[metric].to_numpy()
+        for metric, stats in zip(batch, stats_from_block(block, row_mask)):
+            results[metric] = stats
+        batch.clear()
+
+    for metric in dict.fromkeys(metrics):
+        series = df[metric]
+        if series.dtype == np.float64:
+            batch.append(metric)
+            if len(batch) >= _COLUMN_BATCH:
+                _flush()
+        else:
+            mask = series.notna() if row_mask is None else series.notna().to_numpy() & row_mask
+            results[metric] = compute_stats(series[mask])
+    _flush()
+    return {metric: results[metric] for metric in metrics}
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.excel_parser import (
+    ExcelSchema,
+    ParsedExcel,
+    compact_parsed_excel,
+    load_excel,
+    load_excel_projected,
+    probe_excel_schema,
+)
+from src import incremental_load
+from src.settings import get_parsed_cache_max_mb, get_snapshot_dir
+from src.snapshot_store import file_content_hash, load_snapshot, save_snapshot, snapshot_path
+
+# (绝对路径, 文件大小, mtime_ns, sheet, use_llm_structure, has_time_column, 加载模式)
+CacheKey = Tuple[str, int, int, Optional[str], bool, bool, str]
+
+
+@dataclass
+class _CacheEntry:
+    parsed: ParsedExcel
+    nbytes: int
+
+
+def _estimate_nbytes(parsed: ParsedExcel) -> int:
+    try:
+        return int(parsed.df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+def make_cache_key(
+    path: str,
+    sheet_name: Optional[str],
+    use_llm_structure: bool,
+    has_time_column: bool,
+    mode: str = "full",
+) -> CacheKey:
+    """按文件身份（大小 + 修改时间）与解析参数构造缓存键；文件被改写后键自然失效。
+
+    mode 区分整表加载（full）、列投影加载（projected）与结构探测（schema）。
+    """
+    abs_path = os.path.abspath(path)
+    stat = os.stat(abs_path)
+    return (
+        abs_path,
+        int(stat.st_size),
+        int(stat.st_mtime_ns),
+        sheet_name or None,
+        bool(use_llm_structure),
+        bool(has_time_column),
+        mode,
+    )
+
+
+class ParsedExcelCache:
+    """进程级 ParsedExcel LRU 缓存，按 DataFrame 内存占用做容量淘汰。
+
+    缓存中的 ParsedExcel 会被多个请求共享，调用方不得原地修改其 df。
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, key: CacheKey) -> Optional[ParsedExcel]:
+        """查询但不计入命中统计、不调整 LRU 顺序。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.parsed if entry is not None else None
+
+    def get(self, key: CacheKey) -> Optional[ParsedExcel]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.parsed
+
+    def put(self, key: CacheKey, parsed: ParsedExcel) -> None:
+        nbytes = _estimate_nbytes(parsed)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old.nbytes
+            # 单个对象超过上限时不入缓存，避免把其它条目全部挤出。
+            if self.max_bytes <= 0 or nbytes > self.max_bytes:
+                return
+            # 同一文件的旧版本（大小/mtime 变化）直接移除，不必等 LRU 淘汰。
+            stale = [k for k in self._entries if k[0] == key[0] and k[3:] == key[3:]]
+            for k in stale:
+                self._total_bytes -= self._entries.pop(k).nbytes
+            self._entries[key] = _CacheEntry(parsed=parsed, nbytes=nbytes)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+PARSED_EXCEL_CACHE = ParsedExcelCache(max_bytes=get_parsed_cache_max_mb() * 1024 * 1024)
+
+# 结构探测结果很小，按条数限制即可。
+_SCHEMA_CACHE_MAX_ENTRIES = 64
+_schema_cache: "OrderedDict[CacheKey, ExcelSchema]" = OrderedDict()
+_schema_lock = threading.Lock()
+
+
+# 文件内容摘要按 (绝对路径, 大小, mtime_ns) 记忆，进程缓存未命中时不必每次重读整个文件。
+_DIGEST_CACHE_MAX_ENTRIES = 256
+_digest_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_digest_lock = threading.Lock()
+
+
+def _content_hash(path: str) -> str:
+    abs_path = os.path.abspath(path)
+    stat = os.stat(abs_path)
+    key = (abs_path, int(stat.st_size), int(stat.st_mtime_ns))
+    with _digest_lock:
+        digest = _digest_cache.get(key)
+        if digest is not None:
+            _digest_cache.move_to_end(key)
+            return digest
+    digest = file_content_hash(abs_path)
+    with _digest_lock:
+        _digest_cache[key] = digest
+        while len(_digest_cache) > _DIGEST_CACHE_MAX_ENTRIES:
+            _digest_cache.popitem(last=False)
+    return digest
+
+
+def _snapshot_file(
+    path: str,
+    sheet_name: Optional[str],
+    use_llm_structure: bool,
+    has_time_column: bool,
+) -> Optional[str]:
+    snapshot_dir = get_snapshot_dir()
+    if not snapshot_dir:
+        return None
+    return snapshot_path(
+        snapshot_dir,
+        _content_hash(path),
+        sheet_name,
+        use_llm_structure,
+        has_time_column,
+    )
+
+
+def load_excel_uncached(
+    path: str,
+    preferred_sheet: Optional[str],
+    config_path: Optional[str],
+    use_llm_structure: bool,
+    has_time_column: bool,
+) -> ParsedExcel:
+    """磁盘快照命中则内存映射读取，否则完整解析并写回快照；不经过进程缓存。"""
+    snapshot_file = _snapshot_file(path, preferred_sheet, use_llm_structure, has_time_column)
+    if snapshot_file:
+        parsed = load_snapshot(snapshot_file)
+        if parsed is not None:
+            return parsed
+
+    parsed = load_excel(
+        path,
+        preferred_sheet,
+        config_path=config_path,
+        use_llm_structure=use_llm_structure,
+        has_time_column=has_time_column,
+    )
+    if snapshot_file:
+        save_snapshot(parsed, snapshot_file)
+    return parsed
+
+
+def load_excel_cached(
+    path: str,
+    preferred_sheet: Optional[str] = None,
+    config_path: Optional[str] = None,
+    use_llm_structure: bool = False,
+    has_time_column: bool = True,
+    compact: bool = False,
+) -> ParsedExcel:
+    """带进程级缓存的 load_excel：同一未修改文件、相同参数的重复请求直接复用解析结果（含 LLM 结构识别）。
+
+    进程缓存未命中时，先按文件内容摘要查找磁盘列式快照（跨进程/重启有效），
+    仍未命中才完整解析 Excel，并把结果写回快照。
+    文件只在末尾追加新行时走增量路径（见 incremental_load），只解析新增行。
+    compact=True 时进程缓存只保存紧凑表示（见 compact_parsed_excel），快照仍为完整精度。
+    """
+    key = make_cache_key(
+        path, preferred_sheet, use_llm_structure, has_time_column, mode="compact" if compact else "full"
+    )
+    cached = PARSED_EXCEL_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    if not compact:
+        # 同一文件只在末尾追加了行：只解析新增行，原地更新上次的解析结果。
+        appended = incremental_load.try_append(path, preferred_sheet, use_llm_structure, has_time_column)
+        if appended is not None:
+            PARSED_EXCEL_CACHE.put(key, appended)
+            return appended
+
+    parsed = load_excel_uncached(path, preferred_sheet, config_path, use_llm_structure, has_time_column)
+    if compact:
+        parsed = compact_parsed_excel(parsed)
+    else:
+        incremental_load.remember(path, preferred_sheet, use_llm_structure, has_time_column, parsed)
+    PARSED_EXCEL_CACHE.put(key, parsed)
+    return parsed
+
+
+def probe_excel_schema_cached(
+    path: str,
+    preferred_sheet: Optional[str] = None,
+    config_path: Optional[str] = None,
+    use_llm_structure: bool = False,
+    has_time_column: bool = True,
+) -> ExcelSchema:
+    """带缓存的结构探测（表头 + 少量样本行）。"""
+    key = make_cache_key(path, preferred_sheet, use_llm_structure, has_time_column, mode="schema")
+    with _schema_lock:
+        schema = _schema_cache.get(key)
+        if schema is not None:
+            _schema_cache.move_to_end(key)
+            return schema
+    schema = probe_excel_schema(
+        path,
+        preferred_sheet,
+        config_path=config_path,
+        use_llm_structure=use_llm_structure,
+        has_time_column=has_time_column,
+    )
+    with _schema_lock:
+        _schema_cache[key] = schema
+        while len(_schema_cache) > _SCHEMA_CACHE_MAX_ENTRIES:
+            _schema_cache.popitem(last=False)
+    return schema
+
+
+def load_excel_projected_cached(
+    path: str,
+    columns: List[str],
+    preferred_sheet: Optional[str] = None,
+    config_path: Optional[str] = None,
+    use_llm_structure: bool = False,
+    has_time_column: bool = True,
+) -> ParsedExcel:
+    """两阶段加载：结构探测 + 只读取所需列。
+
+    已有整表缓存或磁盘快照时直接复用整表；否则在同一文件的投影缓存上按需补读缺失列，
+    多轮对话反复分析相同指标时不再重复读取文件。读入列的分类与结构探测不一致时退回整表解析。
+    """
+    full_key = make_cache_key(path, preferred_sheet, use_llm_structure, has_time_column)
+    full = PARSED_EXCEL_CACHE.peek(full_key)
+    if full is not None:
+        return full
+
+    snapshot_file = _snapshot_file(path, preferred_sheet, use_llm_structure, has_time_column)
+    if snapshot_file:
+        parsed = load_snapshot(snapshot_file)
+        if parsed is not None:
+            PARSED_EXCEL_CACHE.put(full_key, parsed)
+            return parsed
+
+    schema = probe_excel_schema_cached(
+        path,
+        preferred_sheet,
+        config_path=config_path,
+        use_llm_structure=use_llm_structure,
+        has_time_column=has_time_column,
+    )
+    wanted = [c for c in dict.fromkeys(str(c) for c in columns) if c in schema.columns]
+    key = make_cache_key(path, preferred_sheet, use_llm_structure, has_time_column, mode="projected")
+    cached = PARSED_EXCEL_CACHE.get(key)
+    loaded = list(cached.loaded_columns or []) if cached is not None else []
+    if cached is not None and set(wanted) <= set(loaded):
+        return cached
+
+    parsed = load_excel_projected(path, loaded + wanted, schema)
+    if parsed is None:
+        # 整列与前几百行的探测结果不一致：以整表解析为准，之后的请求经 full_key 直接复用
+        return load_excel_cached(
+            path,
+            preferred_sheet,
+            config_path=config_path,
+            use_llm_structure=use_llm_structure,
+            has_time_column=has_time_column,
+        )
+    PARSED_EXCEL_CACHE.put(key, parsed)
+    return parsed
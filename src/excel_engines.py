@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from openpyxl.cell.cell import ERROR_CODES
+
+try:
+    from pandas._libs.parsers import STR_NA_VALUES
+except ImportError:  # pragma: no cover - 私有路径在个别 pandas 版本中不存在
+    STR_NA_VALUES = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+                     "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+
+# pandas 默认按 NaN 处理的文本，加上 Excel 错误值（pandas 对错误单元格同样返回 NaN）。
+_NA_TEXT = frozenset(STR_NA_VALUES) | frozenset(ERROR_CODES)
+
+# 读取引擎：
+# - openpyxl：pandas.read_excel 默认路径，逐单元格对象转换；
+# - openpyxl_stream：openpyxl 只读模式 values_only 行迭代，跳过单元格对象构造；
+# - calamine：python-calamine（Rust 实现），安装后大文件优先使用；
+# - xlrd：旧版 .xls。
+ENGINE_OPENPYXL = "openpyxl"
+ENGINE_OPENPYXL_STREAM = "openpyxl_stream"
+ENGINE_CALAMINE = "calamine"
+ENGINE_XLRD = "xlrd"
+ENGINE_AUTO = "auto"
+
+# 引擎对应的可选依赖模块；未安装时退回 openpyxl。
+_ENGINE_MODULES = {
+    ENGINE_OPENPYXL: "openpyxl",
+    ENGINE_OPENPYXL_STREAM: "openpyxl",
+    ENGINE_CALAMINE: "python_calamine",
+    ENGINE_XLRD: "xlrd",
+}
+
+logger = logging.getLogger(__name__)
+_warned_engines: set = set()
+
+# 小于该大小的文件直接用 pandas 默认引擎，选择引擎本身的开销不值得。
+SMALL_FILE_BYTES = 1024 * 1024
+# 维度（行 × 列）达到该规模且没有 calamine 时改用 openpyxl 流式读取。
+STREAM_MIN_CELLS = 200_000
+
+
+def engine_available(engine: str) -> bool:
+    module = _ENGINE_MODULES.get(engine)
+    return module is not None and importlib.util.find_spec(module) is not None
+
+
+def calamine_available() -> bool:
+    return engine_available(ENGINE_CALAMINE)
+
+
+def available_engines() -> List[str]:
+    return [engine for engine in _ENGINE_MODULES if engine_available(engine)]
+
+
+def select_engine(path: str, rows: Optional[int] = None, cols: Optional[int] = None) -> str:
+    """按扩展名、文件大小与工作表维度选择读取引擎。"""
+    if Path(path).suffix.lower() == ".xls":
+        return ENGINE_CALAMINE if calamine_available() else ENGINE_XLRD
+    if os.path.getsize(path) < SMALL_FILE_BYTES:
+        return ENGINE_OPENPYXL
+    if calamine_available():
+        return ENGINE_CALAMINE
+    if rows is not None and cols is not None and rows * cols >= STREAM_MIN_CELLS:
+        return ENGINE_OPENPYXL_STREAM
+    return ENGINE_OPENPYXL
+
+
+def sheet_dimensions(xls: pd.ExcelFile, name: str) -> Tuple[Optional[int], Optional[int]]:
+    """工作表维度元数据 (数据行数, 列数)，不解码单元格；引擎不支持时为 None。"""
+    try:
+        if xls.engine == "openpyxl":
+            ws = xls.book[name]
+            max_row = getattr(ws, "max_row", None)
+            max_col = getattr(ws, "max_column", None)
+            return (int(max_row) - 1 if max_row else None, int(max_col) if max_col else None)
+        if xls.engine == "xlrd":
+            sheet = xls.book.sheet_by_name(name)
+            return max(int(sheet.nrows) - 1, 0), int(sheet.ncols)
+        if xls.engine == "calamine":
+            sheet = xls.book.get_sheet_by_name(name)
+            return max(int(sheet.total_height) - 1, 0), int(sheet.total_width)
+    except Exception:
+        pass
+    return None, None
+
+
+def pandas_compatible_cell(value):
+    """与 pandas 读取 Excel 的单元格归一化一致：空值、默认 NA 文本与错误值为 NaN，整数值浮点转为 int。"""
+    if value is None:
+        return np.nan
+    if value.__class__ is float:
+        return int(value) if value.is_integer() else value
+    if value.__class__ is str and value in _NA_TEXT:
+        return np.nan
+    return value
+
+
+def _header_names(values: Sequence) -> List:
+    """与 pandas 表头处理一致：单元格按 pandas_compatible_cell 归一化，空表头记为 Unnamed: i，重名追加 .1/.2。"""
+    names: List = []
+    seen: dict = {}
+    for i, value in enumerate(values):
+        value = pandas_compatible_cell(value)
+        name = f"Unnamed: {i}" if value is np.nan or str(value).strip() == "" else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _read_openpyxl_stream(xls: pd.ExcelFile, sheet_name: str, nrows: Optional[int] = None) -> pd.DataFrame:
+    ws = xls.book[sheet_name]
+    if getattr(xls.book, "read_only", False):
+        ws.reset_dimensions()
+    rows = ws.iter_rows(values_only=True)
+    header_values = list(next(rows, ()))
+    while header_values and header_values[-1] is None:
+        header_values.pop()
+    data = []
+    last_with_data = -1
+    for row in rows:
+        converted = [pandas_compatible_cell(v) for v in row]
+        if any(v is not np.nan for v in converted):
+            last_with_data = len(data)
+        data.append(converted)
+        if nrows is not None and len(data) >= nrows:
+            break
+    data = data[: last_with_data + 1]
+    width = max([len(header_values)] + [len(r) for r in data])
+    header = _header_names(header_values + [None] * (width - len(header_values)))
+    data = [r + [np.nan] * (width - len(r)) if len(r) < width else r[:width] for r in data]
+    return pd.DataFrame.from_records(data, columns=header) if data else pd.DataFrame(columns=header)
+
+
+def read_sheet(
+    path: str,
+    xls: pd.ExcelFile,
+    sheet_name: str,
+    engine: str,
+    nrows: Optional[int] = None,
+    usecols=None,
+) -> Tuple[pd.DataFrame, str]:
+    """用指定引擎读取单个工作表，返回 (DataFrame, 实际使用的引擎)。
+
+    xls 为已打开的元数据句柄，引擎与之一致时直接复用；流式引擎不支持 usecols，此时退回 xls 自身引擎。
+    配置的引擎未知或其依赖未安装时记录警告并退回 xls 自身引擎（.xlsx 即 openpyxl）。
+    """
+    if engine != xls.engine and not engine_available(engine):
+        if engine not in _warned_engines:
+            _warned_engines.add(engine)
+            logger.warning("Excel 读取引擎 %s 不可用（未知或依赖未安装），改用 %s", engine, xls.engine)
+        engine = xls.engine
+    if engine == ENGINE_OPENPYXL_STREAM and xls.engine == "openpyxl" and usecols is None:
+        return _read_openpyxl_stream(xls, sheet_name, nrows=nrows), ENGINE_OPENPYXL_STREAM
+    if engine in (ENGINE_CALAMINE, ENGINE_XLRD, ENGINE_OPENPYXL) and xls.engine != engine:
+        df = pd.read_excel(path, sheet_name=sheet_name, engine=engine, nrows=nrows, usecols=usecols)
+        return df, engine
+    return xls.parse(sheet_name, nrows=nrows, usecols=usecols), xls.engine
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field, replace
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import time
 import warnings
 
+import numpy as np
 import pandas as pd
 
-from src.table_preprocess import parse_table_columns_from_df
+from src.excel_engines import ENGINE_AUTO, ENGINE_OPENPYXL_STREAM, read_sheet, select_engine, sheet_dimensions
+from src.settings import get_excel_engine, get_stream_load_threshold_mb
+from src.table_preprocess import is_flat_table, null_like_mask, read_flat_table
+
+
+# 无可用时间列时追加的样本序号列名。
+SAMPLE_INDEX_COLUMN = "__sample_index__"
 
 
 @dataclass
@@ -19,13 +29,205 @@ class ParsedExcel:
     units: Dict[str, str]
     column_display_names: Dict[str, str] = field(default_factory=dict)
     location_columns: List[str] = field(default_factory=list)
+    # 列投影加载时实际读入 df 的列；None 表示整表已加载。
+    loaded_columns: Optional[List[str]] = None
+    # 紧凑模式下压缩前/后的 df 内存占用（字节，deep）；未压缩时为 None。
+    memory_bytes_before: Optional[int] = None
+    memory_bytes_after: Optional[int] = None
+    # 实际使用的读取引擎与读取耗时（秒，不含结构识别）。
+    reader_engine: Optional[str] = None
+    read_seconds: Optional[float] = None
+    # 日期列的有序索引（src.time_index.TimeIndex），窗口查询时按需构建，不参与比较与快照。
+    time_index: Any = field(default=None, repr=False, compare=False)
+
+
+# ColumnProfile 中保留的样本值个数。
+PROFILE_SAMPLE_SIZE = 5
+
+
+@dataclass
+class ColumnProfile:
+    """单列画像：一次向量化遍历得到，供日期/定位/数值等所有启发式共用。"""
+
+    name: str
+    length: int
+    null_count: int
+    null_like_count: int
+    unique_count: int
+    numeric_ratio: float
+    datetime_ratio: float
+    sample: List[Any] = field(default_factory=list)
+    # numeric_ratio > 0.5 时保留整列数值转换结果，数值列落地时直接复用，不再二次 to_numeric。
+    numeric_values: Optional[pd.Series] = None
+
+    @property
+    def has_null_like(self) -> bool:
+        return self.null_like_count > 0
+
+    @property
+    def text_unique_ratio(self) -> float:
+        """按文本口径（缺失值计为一个取值）的基数占比。"""
+        if self.length == 0:
+            return 0.0
+        return (self.unique_count + (1 if self.null_count else 0)) / self.length
+
+
+def _is_plain_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def profile_column(name: str, series: pd.Series, datetime_ratio: Optional[float] = None) -> ColumnProfile:
+    """对单列做一次去重编码，在去重值上计算空值/数值/基数等指标后按出现次数加权回整列。"""
+    n_rows = len(series)
+    sample = series.iloc[:PROFILE_SAMPLE_SIZE].tolist()
+    if datetime_ratio is None:
+        datetime_ratio = 0.0
+        if n_rows:
+            datetime_ratio = float(
+                _coerce_datetime(_evenly_spaced_sample(series, DATE_DETECT_SAMPLE_ROWS)).notna().mean()
+            )
+
+    if _is_plain_numeric(series):
+        null_count = int(series.isna().sum())
+        return ColumnProfile(
+            name=name,
+            length=n_rows,
+            null_count=null_count,
+            null_like_count=null_count,
+            unique_count=int(series.nunique(dropna=True)),
+            numeric_ratio=(n_rows - null_count) / n_rows if n_rows else 0.0,
+            datetime_ratio=datetime_ratio,
+            sample=sample,
+            numeric_values=series,
+        )
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    unique_values = pd.Series(np.asarray(uniques, dtype=object))
+    weights = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    null_count = int((codes < 0).sum())
+
+    null_like_uniques = null_like_mask(unique_values).to_numpy(dtype=bool)
+
+    numeric_uniques = pd.to_numeric(unique_values, errors="coerce")
+    numeric_mask = numeric_uniques.notna().to_numpy()
+    numeric_ratio = float(weights[numeric_mask].sum()) / n_rows if n_rows else 0.0
+    numeric_values = None
+    if numeric_ratio > 0.5:
+        mapped = np.append(numeric_uniques.to_numpy(dtype=np.float64), np.nan)
+        numeric_values = pd.Series(mapped[codes], index=series.index)
+
+    return ColumnProfile(
+        name=name,
+        length=n_rows,
+        null_count=null_count,
+        null_like_count=null_count + int(weights[null_like_uniques].sum()),
+        unique_count=len(uniques),
+        numeric_ratio=numeric_ratio,
+        datetime_ratio=datetime_ratio,
+        sample=sample,
+        numeric_values=numeric_values,
+    )
+
+
+def _batched_excel_serial_ratios(df: pd.DataFrame, columns: List[Any]) -> Dict[Any, float]:
+    """把所有数值列的等间距样本拼成一个矩阵，一次换算 Excel 序列日期，得到各列的日期可解析比例。
+
+    口径与 _coerce_datetime 的数值分支一致；不满足「非空 > 0.8 且可换算 > 0.8」的列不在结果中，
+    由调用方按单列逐个判定。
+    """
+    if not columns or len(df) == 0:
+        return {}
+    sample = _evenly_spaced_sample(df[columns], SERIAL_DATE_SAMPLE_ROWS)
+    block = sample.to_numpy(dtype=np.float64, na_value=np.nan)
+    notna_ratio = (~np.isnan(block)).mean(axis=0)
+    converted = pd.to_datetime(block.ravel(order="F"), errors="coerce", unit="D", origin="1899-12-30")
+    parsed_ratio = (~pd.isna(converted)).reshape(block.shape, order="F").mean(axis=0)
+    return {
+        col: float(parsed_ratio[i])
+        for i, col in enumerate(columns)
+        if notna_ratio[i] > 0.8 and parsed_ratio[i] > 0.8
+    }
 
 
-def _select_best_sheet(xls: pd.ExcelFile, preferred: Optional[str]) -> str:
+def profile_columns(df: pd.DataFrame) -> Dict[str, ColumnProfile]:
+    """逐列生成 ColumnProfile，键为 str(列名)；数值列的日期可解析比例批量计算。"""
+    numeric_cols = [col for col in df.columns if _is_plain_numeric(df[col])]
+    serial_ratios = _batched_excel_serial_ratios(df, numeric_cols) if df.columns.is_unique else {}
+    return {
+        str(col): profile_column(str(col), df[col], datetime_ratio=serial_ratios.get(col))
+        for col in df.columns
+    }
+
+
+def _split_columns_by_profile(
+    profiles: Dict[str, ColumnProfile],
+    threshold: int = 10,
+) -> Tuple[List[str], List[str]]:
+    """与 parse_table_columns_from_df 同口径：返回 (定位列, 数值列候选)，直接读取列画像。"""
+    low_cols: List[str] = []
+    high_cols: List[str] = []
+    for name, profile in profiles.items():
+        if profile.has_null_like or profile.unique_count > threshold:
+            high_cols.append(name)
+        else:
+            low_cols.append(name)
+    return low_cols, high_cols
+
+
+# 维度元数据缺失时，有限行探测的上限（只计数、不构建 DataFrame）。
+SHEET_PROBE_ROWS = 5000
+
+
+def _sheet_rows_from_metadata(xls: pd.ExcelFile, name: str, probe_rows: int) -> Optional[int]:
+    """从工作表维度元数据读取行数（不含表头）；引擎不支持时返回 None。"""
+    if xls.engine == "openpyxl":
+        # pandas 以 read_only 模式打开 openpyxl，max_row 来自 <dimension> 标签，无需解码单元格。
+        ws = xls.book[name]
+        max_row = getattr(ws, "max_row", None)
+        if max_row and max_row > 1:
+            return int(max_row) - 1
+        # 部分导出工具不写维度或写成 "A1"：退化为有限行探测。
+        count = 0
+        for row in ws.iter_rows(values_only=True):
+            if any(v is not None for v in row):
+                count += 1
+            if count > probe_rows:
+                break
+        return max(count - 1, 0)
+    if xls.engine == "xlrd":
+        return max(int(xls.book.sheet_by_name(name).nrows) - 1, 0)
+    return None
+
+
+def _select_best_sheet(
+    xls: pd.ExcelFile,
+    preferred: Optional[str],
+    mode: str = "metadata",
+    probe_rows: int = SHEET_PROBE_ROWS,
+) -> Tuple[str, Optional[pd.DataFrame]]:
+    """选择行数最多的工作表，返回 (sheet 名, 已解析的 DataFrame 或 None)。
+
+    mode="metadata"：仅读维度元数据/有限行探测，不构建 DataFrame，返回的 df 为 None；
+    mode="parse"：逐个解析全部 sheet（旧行为），并把胜出 sheet 的解析结果返回供复用。
+    """
     if preferred and preferred in xls.sheet_names:
-        return preferred
+        return preferred, None
+    if len(xls.sheet_names) == 1:
+        return xls.sheet_names[0], None
+
+    if mode == "metadata":
+        row_counts = [_sheet_rows_from_metadata(xls, name, probe_rows) for name in xls.sheet_names]
+        if all(count is not None for count in row_counts):
+            best_sheet = xls.sheet_names[0]
+            best_rows = -1
+            for name, rows in zip(xls.sheet_names, row_counts):
+                if rows > best_rows:
+                    best_rows = rows
+                    best_sheet = name
+            return best_sheet, None
 
     best_sheet = xls.sheet_names[0]
+    best_df: Optional[pd.DataFrame] = None
     best_rows = -1
     for name in xls.sheet_names:
         df = xls.parse(name)
@@ -33,10 +235,23 @@ def _select_best_sheet(xls: pd.ExcelFile, preferred: Optional[str]) -> str:
         if rows > best_rows:
             best_rows = rows
             best_sheet = name
-    return best_sheet
+            best_df = df
+    return best_sheet, best_df
+
 
+def _evenly_spaced_sample(series: pd.Series, size: int) -> pd.Series:
+    """等间距抽样（含首行），保证确定性且覆盖整列分布。"""
+    n = len(series)
+    if n <= size:
+        return series
+    step = -(-n // size)
+    return series.iloc[::step]
 
-def _detect_date_column(df: pd.DataFrame) -> Tuple[str, Dict[str, float]]:
+
+def _detect_date_column(
+    df: pd.DataFrame,
+    profiles: Optional[Dict[str, ColumnProfile]] = None,
+) -> Tuple[str, Dict[str, float]]:
     best_col = df.columns[0]
     best_ratio = -1.0
     ratios: Dict[str, float] = {}
@@ -53,8 +268,14 @@ def _detect_date_column(df: pd.DataFrame) -> Tuple[str, Dict[str, float]]:
     )
 
     for col in df.columns:
-        series = _coerce_datetime(df[col])
-        ratio = series.notna().mean() if len(series) else 0.0
+        # 只在等间距样本上估算可解析比例；胜出列由调用方再做整列转换。
+        profile = profiles.get(str(col)) if profiles else None
+        if profile is not None:
+            ratio = profile.datetime_ratio
+        else:
+            sample = _evenly_spaced_sample(df[col], DATE_DETECT_SAMPLE_ROWS)
+            series = _coerce_datetime(sample)
+            ratio = series.notna().mean() if len(series) else 0.0
         ratios[str(col)] = ratio
         normalized = _normalize_column_name(col)
 
@@ -69,59 +290,202 @@ def _detect_date_column(df: pd.DataFrame) -> Tuple[str, Dict[str, float]]:
     return str(best_col), ratios
 
 
-def _coerce_datetime(series: pd.Series) -> pd.Series:
-    """将列尽可能稳定地转成时间，避免 pandas 在自动推断格式时反复告警。"""
-    if pd.api.types.is_datetime64_any_dtype(series):
-        return pd.to_datetime(series, errors="coerce")
+# 文本日期候选格式，按优先级排列；同一行命中多个格式时取靠前者。
+_DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+    "%Y.%m.%d",
+    "%Y-%m",
+    "%Y/%m",
+    "%Y%m%d",
+    "%Y%m",
+)
+# 文本日期格式探测的去重样本量。
+DATE_FORMAT_SAMPLE_SIZE = 64
+# _detect_date_column 估算每列可解析比例时的抽样行数。
+DATE_DETECT_SAMPLE_ROWS = 1000
+# 数值列批量估算 Excel 序列日期可解析比例时的抽样行数（只看取值范围，少量样本即可）。
+SERIAL_DATE_SAMPLE_ROWS = 200
 
-    # 对纯数字列，优先按 Excel 序列日期尝试（1899-12-30 起算）
-    numeric = pd.to_numeric(series, errors="coerce")
-    if numeric.notna().mean() > 0.8:
-        excel_dates = pd.to_datetime(
-            numeric,
-            errors="coerce",
-            unit="D",
-            origin="1899-12-30",
-        )
-        if excel_dates.notna().mean() > 0.8:
-            return excel_dates
-
-    text_series = series.astype(str).str.strip()
-    candidate_formats = [
-        "%Y-%m-%d",
-        "%Y/%m/%d",
-        "%Y.%m.%d",
-        "%Y-%m",
-        "%Y/%m",
-        "%Y%m%d",
-        "%Y%m",
-    ]
-
-    merged = pd.Series([pd.NaT] * len(series), index=series.index)
-    for fmt in candidate_formats:
-        parsed = pd.to_datetime(text_series, format=fmt, errors="coerce")
-        merged = merged.where(merged.notna(), parsed)
-
-    best = pd.to_datetime(merged, errors="coerce")
-    best_ratio = best.notna().mean() if len(best) else 0.0
 
-    # 兜底：保持兼容性，同时屏蔽 pandas 的格式推断告警。
+def _inferred_datetime(text: pd.Series) -> pd.Series:
     with warnings.catch_warnings():
         warnings.filterwarnings(
             "ignore",
             message="Could not infer format",
             category=UserWarning,
         )
-        fallback = pd.to_datetime(text_series, errors="coerce")
-    fallback_ratio = fallback.notna().mean() if len(fallback) else 0.0
-    return fallback if fallback_ratio > best_ratio else best
+        return pd.to_datetime(text, errors="coerce")
+
+
+def _parse_with_formats(text: pd.Series, formats: List[str]) -> pd.Series:
+    """按格式顺序逐个解析，仅对尚未解析成功的值尝试下一个格式。"""
+    merged = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    pending = pd.Series(True, index=text.index)
+    for fmt in formats:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(text[pending], format=fmt, errors="coerce")
+        merged = merged.where(merged.notna(), parsed)
+        pending = merged.isna()
+    return merged
+
+
+def _fill_per_value(text: pd.Series, parsed: pd.Series) -> pd.Series:
+    """对 parsed 中仍为 NaT 的文本逐个推断格式解析（format="mixed"），已解析的值保持不变。"""
+    pending = parsed.isna()
+    if not pending.any():
+        return parsed
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        filled = pd.to_datetime(text[pending], format="mixed", errors="coerce")
+    return parsed.where(~pending, filled)
+
+
+def _map_unique_back(parsed_uniques: pd.Series, codes, index: pd.Index) -> pd.Series:
+    """把去重值上的解析结果按 factorize 编码映射回整列（编码 -1 即缺失值，对应 NaT）。"""
+    values = pd.to_datetime(parsed_uniques, errors="coerce").to_numpy()
+    values = np.append(values, np.datetime64("NaT"))
+    return pd.Series(values[codes], index=index)
+
+
+def _all_nat(series: pd.Series) -> pd.Series:
+    return pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+
+
+@dataclass(frozen=True)
+class DatePlan:
+    """一列的日期解析方式：在一段数据上探测一次，之后（如流式读取的后续数据块）直接复用。
+
+    kind：datetime（已是时间类型）/ excel_serial（Excel 序列日期）/ formats（按 formats 顺序解析文本）/
+    inferred（pandas 自动推断）/ none（不是时间列，全部为 NaT）。
+    """
+
+    kind: str
+    formats: Tuple[str, ...] = ()
+    # 按 kind 解析后仍为 NaT 的值再逐个解析（探测时整列命中率低于样本命中率）
+    per_value: bool = False
+
+
+def _excel_serial_dates(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values, errors="coerce", unit="D", origin="1899-12-30")
+
+
+def _apply_date_plan(series: pd.Series, plan: DatePlan) -> pd.Series:
+    if plan.kind == "none" or len(series) == 0:
+        return _all_nat(series)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.to_datetime(series, errors="coerce")
+    if plan.kind == "datetime":
+        # 探测时整列已是时间类型、本块却混入了文本等值：本块单独探测
+        return _resolve_datetime(series)[0]
+    if plan.kind == "excel_serial":
+        return _excel_serial_dates(pd.to_numeric(series, errors="coerce"))
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    text_uniques = pd.Series(np.asarray(uniques, dtype=object)).astype(str).str.strip()
+    if plan.kind == "inferred":
+        parsed_uniques = _inferred_datetime(text_uniques)
+    else:
+        parsed_uniques = _parse_with_formats(text_uniques, list(plan.formats))
+    if plan.per_value:
+        parsed_uniques = _fill_per_value(text_uniques, parsed_uniques)
+    return _map_unique_back(parsed_uniques, codes, series.index)
+
+
+def _resolve_datetime(series: pd.Series) -> Tuple[pd.Series, DatePlan]:
+    """探测解析方式并转换整列，返回 (时间列, DatePlan)。"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.to_datetime(series, errors="coerce"), DatePlan("datetime")
+    if len(series) == 0:
+        return _all_nat(series), DatePlan("none")
+
+    is_numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+    if is_numeric and series.notna().mean() > 0.8:
+        # 数值列去重收益很小，直接整列向量化换算 Excel 序列日期。
+        excel_dates = _excel_serial_dates(series)
+        if excel_dates.notna().mean() > 0.8:
+            return excel_dates, DatePlan("excel_serial")
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    if len(uniques) == 0:
+        return _all_nat(series), DatePlan("none")
+    unique_series = pd.Series(np.asarray(uniques, dtype=object))
+    # 每个去重值在原列中的出现次数，用于把去重值上的命中换算为按行比例。
+    weights = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    n_rows = len(series)
+
+    def _row_ratio(parsed: pd.Series) -> float:
+        return float(weights[parsed.notna().to_numpy()].sum()) / n_rows
+
+    # 对纯数字列，优先按 Excel 序列日期尝试（1899-12-30 起算）
+    numeric = pd.to_numeric(unique_series, errors="coerce")
+    if not is_numeric and _row_ratio(numeric) > 0.8:
+        excel_dates = _excel_serial_dates(numeric)
+        if _row_ratio(excel_dates) > 0.8:
+            return _map_unique_back(excel_dates, codes, series.index), DatePlan("excel_serial")
+
+    text_uniques = unique_series.astype(str).str.strip()
+    # 样本在去重值上等间距抽取，覆盖列中后段才出现的格式
+    text_sample = _evenly_spaced_sample(text_uniques, DATE_FORMAT_SAMPLE_SIZE)
+    if not text_sample.str.contains(r"\d", regex=True).any():
+        return _all_nat(series), DatePlan("none")
+
+    chosen_formats: List[str] = []
+    sample_parsed = pd.Series(pd.NaT, index=text_sample.index, dtype="datetime64[ns]")
+    for fmt in _DATE_FORMATS:
+        pending = sample_parsed.isna()
+        parsed = pd.to_datetime(text_sample[pending], format=fmt, errors="coerce")
+        if parsed.notna().any():
+            chosen_formats.append(fmt)
+            sample_parsed = sample_parsed.where(sample_parsed.notna(), parsed)
+            if sample_parsed.notna().all():
+                break
+    format_ratio = float(sample_parsed.notna().mean())
+
+    # 兜底：保持兼容性，同时屏蔽 pandas 的格式推断告警；格式已全部命中时跳过。
+    use_fallback = False
+    sample_ratio = format_ratio
+    if format_ratio < 1.0:
+        fallback_ratio = float(_inferred_datetime(text_sample).notna().mean())
+        use_fallback = fallback_ratio > format_ratio
+        if fallback_ratio == 0.0 and format_ratio == 0.0:
+            return _all_nat(series), DatePlan("none")
+        sample_ratio = max(format_ratio, fallback_ratio)
+
+    if use_fallback:
+        plan = DatePlan("inferred")
+        parsed_uniques = _inferred_datetime(text_uniques)
+    else:
+        plan = DatePlan("formats", tuple(chosen_formats))
+        parsed_uniques = _parse_with_formats(text_uniques, chosen_formats)
+    if float(parsed_uniques.notna().mean()) < sample_ratio:
+        # 整列命中率低于样本：样本之外还有未覆盖的格式，剩余值逐个解析
+        plan = replace(plan, per_value=True)
+        parsed_uniques = _fill_per_value(text_uniques, parsed_uniques)
+    return _map_unique_back(parsed_uniques, codes, series.index), plan
+
+
+def detect_date_plan(series: pd.Series) -> DatePlan:
+    """在 series（通常是首个数据块的日期列）上探测日期解析方式。"""
+    return _resolve_datetime(series)[1]
+
+
+def _coerce_datetime(series: pd.Series, plan: Optional[DatePlan] = None) -> pd.Series:
+    """将列尽可能稳定地转成时间，避免 pandas 在自动推断格式时反复告警。
+
+    解析只作用于去重值再按编码映射回整列；文本格式在少量去重样本上探测并尽早停止，
+    样本显示明显不是时间的列直接返回全 NaT。给定 plan 时跳过探测，按 plan 解析。
+    """
+    if plan is not None:
+        return _apply_date_plan(series, plan)
+    return _resolve_datetime(series)[0]
 
 
 def _normalize_column_name(name: str) -> str:
     return "".join(str(name).strip().lower().split())
 
 
-def _is_semiconductor_location_column(col: str, raw_series: pd.Series) -> bool:
+def _is_semiconductor_location_column(col: str, profile: ColumnProfile) -> bool:
     """识别 wafer/lot/die/wl 等定位字段，避免误当作分析指标。"""
     normalized = _normalize_column_name(col)
     tokens = {
@@ -161,12 +525,9 @@ def _is_semiconductor_location_column(col: str, raw_series: pd.Series) -> bool:
         return True
 
     # 纯 ID 型列：基数高 + 以离散取值为主，不应当做连续指标。
-    as_text = raw_series.astype(str).str.strip()
-    if len(as_text) == 0:
+    if profile.length == 0:
         return False
-    unique_ratio = as_text.nunique(dropna=True) / max(len(as_text), 1)
-    numeric_ratio = pd.to_numeric(raw_series, errors="coerce").notna().mean()
-    if unique_ratio > 0.8 and numeric_ratio < 0.2:
+    if profile.text_unique_ratio > 0.8 and profile.numeric_ratio < 0.2:
         return True
     return False
 
@@ -189,28 +550,49 @@ def _extract_unit_from_name(name: str) -> Optional[str]:
     return None
 
 
+_UNIT_MARKERS = frozenset({"单位", "unit"})
+
+
+def _normalized_text(series: pd.Series) -> pd.Series:
+    """字符串单元格 strip + lower，非字符串单元格为 NaN（不做 str() 转换）。"""
+    if not (
+        pd.api.types.is_object_dtype(series)
+        or pd.api.types.is_string_dtype(series)
+        or isinstance(series.dtype, pd.CategoricalDtype)
+    ):
+        return pd.Series(np.nan, index=series.index, dtype=object)
+    try:
+        return series.str.strip().str.lower()
+    except AttributeError:
+        # object 列中全部是数字/日期等非字符串值时 .str 不可用
+        return pd.Series(np.nan, index=series.index, dtype=object)
+
+
 def _extract_units_from_rows(
     df: pd.DataFrame,
     date_col: str,
     numeric_cols: List[str],
     units: Dict[str, str],
 ) -> Dict[str, str]:
+    """从「单位」标记行与「指标/单位」对照列中补充单位，整列向量化，耗时 O(行 + 列)。"""
     updated = dict(units)
-    unit_markers = {"单位", "unit"}
 
-    unit_rows = df[df[date_col].isna()]
-    for _, row in unit_rows.iterrows():
-        values = [str(v).strip().lower() for v in row.values if isinstance(v, str)]
-        if not any(v in unit_markers for v in values):
-            continue
-        for col in numeric_cols:
-            value = row.get(col)
-            if isinstance(value, str):
-                unit = value.strip()
-                if unit:
-                    updated[col] = unit
-        break
+    # 1) 日期为空的行中，首个含「单位/unit」文本单元格的行视为单位行
+    unit_rows = df.loc[df[date_col].isna().to_numpy()]
+    if not unit_rows.empty:
+        marker_hits = np.zeros(len(unit_rows), dtype=bool)
+        for i in range(unit_rows.shape[1]):
+            marker_hits |= _normalized_text(unit_rows.iloc[:, i]).isin(_UNIT_MARKERS).to_numpy()
+        if marker_hits.any():
+            row = unit_rows.iloc[int(np.argmax(marker_hits))]
+            for col in numeric_cols:
+                value = row.get(col)
+                if isinstance(value, str):
+                    unit = value.strip()
+                    if unit:
+                        updated[col] = unit
 
+    # 2) 长表中的「指标」列与「单位」列：按指标名（小写）与数值列名做字典连接，后出现的行覆盖先出现的
     unit_col = None
     indicator_col = None
     for col in df.columns:
@@ -221,57 +603,61 @@ def _extract_units_from_rows(
             indicator_col = col
 
     if unit_col and indicator_col:
-        for _, row in df[[indicator_col, unit_col]].dropna().iterrows():
-            indicator = str(row[indicator_col]).strip()
-            unit = str(row[unit_col]).strip()
-            if not indicator or not unit:
-                continue
-            normalized_indicator = indicator.lower()
-            for col in numeric_cols:
-                if col.lower() == normalized_indicator:
-                    updated[col] = unit
+        pairs = df[[indicator_col, unit_col]].dropna()
+        indicators = pairs[indicator_col].astype(str).str.strip()
+        unit_values = pairs[unit_col].astype(str).str.strip()
+        valid = (indicators != "") & (unit_values != "")
+        unit_by_indicator = dict(zip(indicators[valid].str.lower(), unit_values[valid]))
+        for col in numeric_cols:
+            unit = unit_by_indicator.get(col.lower())
+            if unit is not None:
+                updated[col] = unit
 
     return updated
 
 
-def load_excel(
-    path: str,
-    preferred_sheet: Optional[str] = None,
-    config_path: Optional[str] = None,
-    use_llm_structure: bool = False,
-    has_time_column: bool = True,
-) -> ParsedExcel:
-    xls = pd.ExcelFile(path)
-    sheet_name = _select_best_sheet(xls, preferred_sheet)
-    df = xls.parse(sheet_name)
+@dataclass
+class _Structure:
+    df: pd.DataFrame
+    date_column: str
+    numeric_columns: List[str]
+    location_columns: List[str]
+    units: Dict[str, str]
+    column_display_names: Dict[str, str]
+
 
+def sample_index_dates(length: int, start: int = 0) -> pd.DatetimeIndex:
+    """无时间列时的样本序号轴：第 i 个样本映射为 2000-01-01 + i 天。"""
+    return pd.to_datetime(
+        pd.RangeIndex(start=start, stop=start + length, step=1),
+        unit="D",
+        origin="2000-01-01",
+    )
+
+
+def _detect_structure(df: pd.DataFrame, has_time_column: bool) -> _Structure:
+    """启发式识别日期列、数值指标列、定位列、单位与展示名；数值列会被原地转为数值类型。
+
+    每列只做一次画像（profile_columns），之后的所有判断都读取画像，不再重复遍历列数据。
+    """
+    profiles = profile_columns(df)
     if has_time_column:
-        date_col, ratios = _detect_date_column(df)
+        date_col, ratios = _detect_date_column(df, profiles)
         date_series = _coerce_datetime(df[date_col])
 
         # 某些测试数据没有真实时间列（仅有批次/定位/性能参数），降级为样本序号轴。
         if date_series.notna().mean() < 0.2:
-            fallback_col = "__sample_index__"
-            df[fallback_col] = pd.to_datetime(
-                pd.RangeIndex(start=0, stop=len(df), step=1),
-                unit="D",
-                origin="2000-01-01",
-            )
-            date_col = fallback_col
+            df[SAMPLE_INDEX_COLUMN] = sample_index_dates(len(df))
+            date_col = SAMPLE_INDEX_COLUMN
             date_series = df[date_col]
     else:
-        fallback_col = "__sample_index__"
-        df[fallback_col] = pd.to_datetime(
-            pd.RangeIndex(start=0, stop=len(df), step=1),
-            unit="D",
-            origin="2000-01-01",
-        )
-        date_col = fallback_col
+        df[SAMPLE_INDEX_COLUMN] = sample_index_dates(len(df))
+        date_col = SAMPLE_INDEX_COLUMN
         date_series = df[date_col]
 
     df = df.assign(**{date_col: date_series})
 
-    pre_low_cols, pre_high_cols = parse_table_columns_from_df(df, threshold=10)
+    pre_low_cols, pre_high_cols = _split_columns_by_profile(profiles, threshold=10)
     high_col_set = {c for c in pre_high_cols if c != date_col}
 
     numeric_cols: List[str] = []
@@ -279,17 +665,20 @@ def load_excel(
     for col in df.columns:
         if col == date_col:
             continue
-        if _is_semiconductor_location_column(str(col), df[col]):
+        profile = profiles.get(str(col))
+        if profile is None:
+            continue
+        if _is_semiconductor_location_column(str(col), profile):
             if str(col) not in location_cols:
                 location_cols.append(str(col))
             continue
         if high_col_set and str(col) not in high_col_set:
             # 通用预处理节点：低基数列优先作为定位字段，不进入指标分析。
             continue
-        series = pd.to_numeric(df[col], errors="coerce")
-        if series.notna().mean() > 0.5:
+        if profile.numeric_ratio > 0.5 and profile.numeric_values is not None:
             numeric_cols.append(str(col))
-            df[col] = series
+            if not _is_plain_numeric(df[col]):
+                df[col] = profile.numeric_values
 
     units: Dict[str, str] = {}
     for col in numeric_cols:
@@ -304,8 +693,8 @@ def load_excel(
         c0, c1 = str(df.columns[i]), str(df.columns[i + 1])
         if c0 == date_col or c1 == date_col or ("指标" not in c0) or (":" not in c1):
             continue
-        r1 = pd.to_numeric(df[c1], errors="coerce").notna().mean()
-        if r1 < 0.01:
+        profile = profiles.get(c1)
+        if profile is None or profile.numeric_ratio < 0.01:
             continue
         if c0 in numeric_cols:
             numeric_cols.remove(c0)
@@ -314,8 +703,28 @@ def load_excel(
             df[c1] = pd.to_numeric(df[c1], errors="coerce")
         column_display_names[c1] = c1
 
-    if use_llm_structure and config_path:
-        try:
+    return _Structure(
+        df=df,
+        date_column=str(date_col),
+        numeric_columns=numeric_cols,
+        location_columns=location_cols,
+        units=units,
+        column_display_names=column_display_names,
+    )
+
+
+def _apply_llm_structure(structure: _Structure, config_path: str) -> _Structure:
+    """用 LLM 根据列名与前 5 行样本修正日期列/数值列/展示名；失败时保留启发式结果。
+
+    结果按表结构指纹（有序列名 + dtype）缓存到磁盘，同一模板再次上传时不再调用模型。
+    """
+    df = structure.df
+    try:
+        from src import structure_cache
+
+        fingerprint = structure_cache.schema_fingerprint(df)
+        llm_result = structure_cache.get_structure(fingerprint)
+        if llm_result is None:
             from src.llm_client import analyze_excel_structure
 
             sample_by_column = {
@@ -325,41 +734,291 @@ def load_excel(
                 config_path=config_path,
                 column_names=[str(c) for c in df.columns],
                 sample_by_column=sample_by_column,
+                date_column_hint=None if structure.date_column == SAMPLE_INDEX_COLUMN else str(structure.date_column),
             )
-            llm_date = llm_result.get("date_column")
-            llm_numeric = llm_result.get("numeric_columns")
-            if isinstance(llm_date, str) and llm_date in df.columns:
-                date_col = llm_date
-                df[date_col] = _coerce_datetime(df[date_col])
-            if isinstance(llm_numeric, list) and len(llm_numeric) > 0:
-                numeric_cols = []
-                column_display_names = {}
-                for item in llm_numeric:
-                    if not isinstance(item, dict):
-                        continue
-                    c = item.get("column")
-                    d = item.get("display_name") or c
-                    if c and str(c) in df.columns:
-                        numeric_cols.append(str(c))
-                        column_display_names[str(c)] = str(d) if d else str(c)
-                for col in numeric_cols:
-                    df[col] = pd.to_numeric(df[col], errors="coerce")
-                units = {}
-                for c in numeric_cols:
-                    u = _extract_unit_from_name(c)
-                    if u:
-                        units[c] = u
-                units = _extract_units_from_rows(df, date_col, numeric_cols, units)
-        except Exception:
-            pass
+            structure_cache.put_structure(fingerprint, [str(c) for c in df.columns], llm_result)
+        llm_date = llm_result.get("date_column")
+        llm_numeric = llm_result.get("numeric_columns")
+        if isinstance(llm_date, str) and llm_date in df.columns:
+            structure.date_column = llm_date
+            df[llm_date] = _coerce_datetime(df[llm_date])
+        if isinstance(llm_numeric, list) and len(llm_numeric) > 0:
+            numeric_cols: List[str] = []
+            column_display_names: Dict[str, str] = {}
+            for item in llm_numeric:
+                if not isinstance(item, dict):
+                    continue
+                c = item.get("column")
+                d = item.get("display_name") or c
+                if c and str(c) in df.columns:
+                    numeric_cols.append(str(c))
+                    column_display_names[str(c)] = str(d) if d else str(c)
+            structure.numeric_columns = numeric_cols
+            structure.column_display_names = column_display_names
+            for col in numeric_cols:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+            units: Dict[str, str] = {}
+            for c in numeric_cols:
+                u = _extract_unit_from_name(c)
+                if u:
+                    units[c] = u
+            structure.units = _extract_units_from_rows(df, structure.date_column, numeric_cols, units)
+    except Exception:
+        pass
+    return structure
 
-    return ParsedExcel(
+
+def _should_stream(path: str) -> bool:
+    threshold_mb = get_stream_load_threshold_mb()
+    if threshold_mb <= 0 or Path(path).suffix.lower() not in (".xlsx", ".xlsm"):
+        return False
+    try:
+        return os.path.getsize(path) >= threshold_mb * 1024 * 1024
+    except OSError:
+        return False
+
+
+def load_excel(
+    path: str,
+    preferred_sheet: Optional[str] = None,
+    config_path: Optional[str] = None,
+    use_llm_structure: bool = False,
+    has_time_column: bool = True,
+    sheet_selection: str = "metadata",
+    compact: bool = False,
+    engine: Optional[str] = None,
+) -> ParsedExcel:
+    """engine 为 None 时取 DATA_ANALYSIS_EXCEL_ENGINE（默认 auto，见 excel_engines.select_engine）。
+
+    .xlsx 文件不小于 DATA_ANALYSIS_STREAM_LOAD_MB 时改走 src.excel_stream 的流式分块读取，
+    峰值内存只与块大小相关，结果只保留日期/指标/定位列。
+    """
+    started = time.perf_counter()
+    if _should_stream(path):
+        from src.excel_stream import load_excel_streaming
+
+        parsed = load_excel_streaming(
+            path,
+            preferred_sheet,
+            has_time_column=has_time_column,
+            config_path=config_path if use_llm_structure else None,
+        )
+        parsed.reader_engine = ENGINE_OPENPYXL_STREAM
+        parsed.read_seconds = time.perf_counter() - started
+        return compact_parsed_excel(parsed) if compact else parsed
+    if is_flat_table(path):
+        # CSV/Parquet 没有工作表，以文件名作为唯一的 sheet 名。
+        sheet_name = Path(path).stem
+        sheet_names = [sheet_name]
+        df = read_flat_table(path)
+        engine = df.attrs.get("reader_engine")
+    else:
+        xls = pd.ExcelFile(path)
+        sheet_names = xls.sheet_names
+        sheet_name, df = _select_best_sheet(xls, preferred_sheet, mode=sheet_selection)
+        if df is None:
+            engine = engine or get_excel_engine()
+            if engine == ENGINE_AUTO:
+                engine = select_engine(path, *sheet_dimensions(xls, sheet_name))
+            started = time.perf_counter()
+            df, engine = read_sheet(path, xls, sheet_name, engine)
+        else:
+            engine = xls.engine
+    read_seconds = time.perf_counter() - started
+
+    structure = _detect_structure(df, has_time_column)
+    if use_llm_structure and config_path:
+        structure = _apply_llm_structure(structure, config_path)
+
+    parsed = ParsedExcel(
+        sheet_name=sheet_name,
+        df=structure.df,
+        date_column=str(structure.date_column),
+        numeric_columns=structure.numeric_columns,
+        available_sheets=sheet_names,
+        units=structure.units,
+        column_display_names=structure.column_display_names,
+        location_columns=structure.location_columns,
+        reader_engine=engine,
+        read_seconds=read_seconds,
+    )
+    return compact_parsed_excel(parsed) if compact else parsed
+
+
+def _float32_lossless(series: pd.Series) -> bool:
+    """float32 往返（float64 → float32 → float64）后数值与原值完全相同（NaN 视为相等）时，才允许降为 float32。"""
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    with np.errstate(over="ignore"):
+        widened = values.astype(np.float32).astype(np.float64)
+    return bool(np.array_equal(widened, values, equal_nan=True))
+
+
+def compact_parsed_excel(parsed: ParsedExcel) -> ParsedExcel:
+    """紧凑表示：只保留日期/指标/定位列，指标列在无损时降为 float32，定位列转为分类编码，行索引为 RangeIndex。
+
+    返回新的 ParsedExcel（不修改入参，缓存中的对象可能被共享），并记录压缩前后的内存占用。
+    样本序号轴仍保留为 datetime64 列（不改为整数编码）：时间索引、窗口与图表都按日期列读取，
+    整数编码每行只省 4 字节，却要求所有读取方区分两种模式。
+    """
+    df = parsed.df
+    before = int(df.memory_usage(index=True, deep=True).sum())
+    keep = [parsed.date_column] + list(parsed.numeric_columns) + list(parsed.location_columns)
+    keep = [c for c in dict.fromkeys(keep) if c in df.columns]
+
+    data: Dict[str, pd.Series] = {}
+    for col in keep:
+        series = df[col]
+        if col in parsed.numeric_columns and series.dtype == np.float64 and _float32_lossless(series):
+            series = series.astype(np.float32)
+        elif col in parsed.location_columns and not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+        data[col] = series.reset_index(drop=True)
+    compact_df = pd.DataFrame(data, columns=keep)
+
+    return replace(
+        parsed,
+        df=compact_df,
+        memory_bytes_before=before,
+        memory_bytes_after=int(compact_df.memory_usage(index=True, deep=True).sum()),
+    )
+
+
+# 两阶段加载第一阶段（结构探测）读取的数据行数。
+SCHEMA_PROBE_ROWS = 200
+
+
+@dataclass
+class ExcelSchema:
+    """表头 + 少量样本行得到的结构信息，用于指标匹配与列投影，不含完整数据。"""
+
+    sheet_name: str
+    available_sheets: List[str]
+    columns: List[str]
+    date_column: str
+    numeric_columns: List[str]
+    location_columns: List[str]
+    units: Dict[str, str]
+    column_display_names: Dict[str, str] = field(default_factory=dict)
+    sample: Optional[pd.DataFrame] = None
+
+
+def probe_excel_schema(
+    path: str,
+    preferred_sheet: Optional[str] = None,
+    config_path: Optional[str] = None,
+    use_llm_structure: bool = False,
+    has_time_column: bool = True,
+    sample_rows: int = SCHEMA_PROBE_ROWS,
+) -> ExcelSchema:
+    """第一阶段：只读表头与前 sample_rows 行，运行与 load_excel 相同的结构识别。"""
+    if is_flat_table(path):
+        sheet_name = Path(path).stem
+        sheet_names = [sheet_name]
+        df = read_flat_table(path, nrows=sample_rows)
+    else:
+        xls = pd.ExcelFile(path)
+        sheet_names = list(xls.sheet_names)
+        sheet_name, _ = _select_best_sheet(xls, preferred_sheet)
+        df = xls.parse(sheet_name, nrows=sample_rows)
+    columns = [str(c) for c in df.columns]
+
+    structure = _detect_structure(df, has_time_column)
+    if use_llm_structure and config_path:
+        structure = _apply_llm_structure(structure, config_path)
+
+    return ExcelSchema(
         sheet_name=sheet_name,
+        available_sheets=sheet_names,
+        columns=columns,
+        date_column=str(structure.date_column),
+        numeric_columns=structure.numeric_columns,
+        location_columns=structure.location_columns,
+        units=structure.units,
+        column_display_names=structure.column_display_names,
+        sample=structure.df,
+    )
+
+
+def _projection_disagrees(df: pd.DataFrame, schema: ExcelSchema, wanted: List[str]) -> bool:
+    """读入的整列与结构探测（只看前 SCHEMA_PROBE_ROWS 行）的分类不一致时返回 True。
+
+    口径同 _detect_structure：日期列可解析比例不足 0.2 时整表解析会退回样本序号轴；
+    数值列在后续行出现大量文本、或低基数定位列在整列上成为数值列时，指标列表会不同。
+    """
+    if schema.date_column in df.columns and schema.date_column != SAMPLE_INDEX_COLUMN:
+        if len(df) and _coerce_datetime(df[schema.date_column]).notna().mean() < 0.2:
+            return True
+    numeric_set = set(schema.numeric_columns)
+    for col in wanted:
+        if col == schema.date_column or col in schema.column_display_names:
+            continue
+        profile = profile_column(col, df[col], datetime_ratio=0.0)
+        is_metric = (
+            not _is_semiconductor_location_column(col, profile)
+            and (profile.has_null_like or profile.unique_count > 10)
+            and profile.numeric_ratio > 0.5
+        )
+        if is_metric != (col in numeric_set):
+            return True
+    return False
+
+
+def load_excel_projected(
+    path: str,
+    columns: List[str],
+    schema: ExcelSchema,
+) -> Optional[ParsedExcel]:
+    """第二阶段：按 schema 只读取日期列与 columns 中的列（usecols 投影），其余列不进入 DataFrame。
+
+    返回的 ParsedExcel 仍携带 schema 中的完整 numeric_columns/展示名，便于指标解析；
+    实际已加载的列记录在 loaded_columns 中。读入的整列与探测分类不一致时返回 None，由调用方整表解析。
+    """
+    wanted = [c for c in dict.fromkeys(str(c) for c in columns) if c in schema.columns]
+    read_set = set(wanted)
+    if schema.date_column in schema.columns:
+        read_set.add(schema.date_column)
+    if not read_set and schema.columns:
+        # 仅需样本序号轴时仍要读一列以确定行数。
+        read_set.add(schema.columns[0])
+
+    started = time.perf_counter()
+    if is_flat_table(path):
+        df = read_flat_table(path, columns=[c for c in schema.columns if c in read_set])
+        engine = df.attrs.get("reader_engine")
+    else:
+        xls = pd.ExcelFile(path)
+        engine = get_excel_engine()
+        if engine == ENGINE_AUTO:
+            engine = select_engine(path, *sheet_dimensions(xls, schema.sheet_name))
+        df, engine = read_sheet(path, xls, schema.sheet_name, engine, usecols=lambda c: str(c) in read_set)
+    read_seconds = time.perf_counter() - started
+    df.columns = [str(c) for c in df.columns]
+    if _projection_disagrees(df, schema, [c for c in wanted if c in df.columns]):
+        return None
+
+    if schema.date_column == SAMPLE_INDEX_COLUMN:
+        df[SAMPLE_INDEX_COLUMN] = sample_index_dates(len(df))
+    elif schema.date_column in df.columns:
+        df[schema.date_column] = _coerce_datetime(df[schema.date_column])
+
+    numeric_set = set(schema.numeric_columns)
+    for col in wanted:
+        if col in numeric_set:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+
+    keep = [schema.date_column] + [c for c in wanted if c != schema.date_column]
+    df = df[[c for c in keep if c in df.columns]]
+
+    return ParsedExcel(
+        sheet_name=schema.sheet_name,
         df=df,
-        date_column=str(date_col),
-        numeric_columns=numeric_cols,
-        available_sheets=xls.sheet_names,
-        units=units,
-        column_display_names=column_display_names,
-        location_columns=location_cols,
+        date_column=schema.date_column,
+        numeric_columns=list(schema.numeric_columns),
+        available_sheets=list(schema.available_sheets),
+        units=dict(schema.units),
+        column_display_names=dict(schema.column_display_names),
+        location_columns=list(schema.location_columns),
+        loaded_columns=list(df.columns),
+        reader_engine=engine,
+        read_seconds=read_seconds,
     )
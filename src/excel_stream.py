@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.excel_parser import (
+    SAMPLE_INDEX_COLUMN,
+    DatePlan,
+    ParsedExcel,
+    _apply_llm_structure,
+    _coerce_datetime,
+    _detect_structure,
+    _select_best_sheet,
+    detect_date_plan,
+    sample_index_dates,
+)
+
+DEFAULT_CHUNK_ROWS = 50_000
+# 结构识别（日期列/数值列/定位列/单位行）只在表头后的前若干行上进行。
+DEFAULT_SAMPLE_ROWS = 2_000
+
+# 一个数据块：列名 -> 该块内的紧凑数组（日期 datetime64[ns]、指标 float64、定位列 object）。
+ColumnChunk = Dict[str, np.ndarray]
+
+
+@dataclass
+class StreamSchema:
+    sheet_name: str
+    available_sheets: List[str]
+    date_column: str
+    numeric_columns: List[str]
+    location_columns: List[str]
+    units: Dict[str, str]
+    column_display_names: Dict[str, str] = field(default_factory=dict)
+    # 日期列解析方式，在首块样本上探测一次，后续各块沿用，保证同一列各块口径一致
+    date_plan: Optional[DatePlan] = None
+
+    @property
+    def columns(self) -> List[str]:
+        """块内输出的列顺序：日期列 + 数值指标列 + 定位列。"""
+        return [self.date_column] + self.numeric_columns + self.location_columns
+
+
+def _normalize_header(values: Sequence) -> List[str]:
+    """与 pandas.read_excel 保持一致：空表头记为 Unnamed: i，重名列追加 .1/.2 后缀。"""
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _rows_to_frame(header: List[str], rows: List[tuple]) -> pd.DataFrame:
+    width = len(header)
+    fixed = [row[:width] if len(row) >= width else row + (None,) * (width - len(row)) for row in rows]
+    return pd.DataFrame.from_records(fixed, columns=header)
+
+
+def _convert_chunk(frame: pd.DataFrame, schema: StreamSchema, row_offset: int) -> ColumnChunk:
+    chunk: ColumnChunk = {}
+    if schema.date_column == SAMPLE_INDEX_COLUMN:
+        dates = sample_index_dates(len(frame), start=row_offset)
+        chunk[SAMPLE_INDEX_COLUMN] = np.asarray(dates, dtype="datetime64[ns]")
+    else:
+        dates = _coerce_datetime(frame[schema.date_column], schema.date_plan)
+        chunk[schema.date_column] = dates.to_numpy(dtype="datetime64[ns]")
+    for col in schema.numeric_columns:
+        chunk[col] = pd.to_numeric(frame[col], errors="coerce").to_numpy(dtype=np.float64)
+    for col in schema.location_columns:
+        chunk[col] = frame[col].to_numpy(dtype=object)
+    return chunk
+
+
+def iter_excel_chunks(
+    path: str,
+    preferred_sheet: Optional[str] = None,
+    has_time_column: bool = True,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    sample_rows: int = DEFAULT_SAMPLE_ROWS,
+    config_path: Optional[str] = None,
+) -> Tuple[StreamSchema, Iterator[ColumnChunk]]:
+    """基于 openpyxl 只读行迭代的流式读取，返回 (结构, 数据块迭代器)。
+
+    结构识别（提供 config_path 时再经 LLM 修正）与日期格式探测只在前 sample_rows 行上完成一次；
+    之后每 chunk_rows 行按同一结构与日期解析方式转换为一个 ColumnChunk，
+    未被识别为日期/指标/定位的文本列不会保留，峰值内存只与块大小相关。
+    仅支持 .xlsx（openpyxl 引擎）；迭代结束或中途关闭时释放文件句柄。
+    """
+    xls = pd.ExcelFile(path, engine="openpyxl")
+    try:
+        sheet_name, _ = _select_best_sheet(xls, preferred_sheet)
+        rows = xls.book[sheet_name].iter_rows(values_only=True)
+        header = _normalize_header(next(rows, ()))
+        sample: List[tuple] = []
+        for row in rows:
+            sample.append(tuple(row))
+            if len(sample) >= sample_rows:
+                break
+    except Exception:
+        xls.close()
+        raise
+
+    sample_frame = _rows_to_frame(header, sample)
+    structure = _detect_structure(sample_frame.copy(), has_time_column)
+    if config_path:
+        structure = _apply_llm_structure(structure, config_path)
+    date_plan = None
+    if structure.date_column != SAMPLE_INDEX_COLUMN:
+        date_plan = detect_date_plan(sample_frame[structure.date_column])
+    schema = StreamSchema(
+        sheet_name=sheet_name,
+        available_sheets=list(xls.sheet_names),
+        date_column=structure.date_column,
+        numeric_columns=structure.numeric_columns,
+        location_columns=structure.location_columns,
+        units=structure.units,
+        column_display_names=structure.column_display_names,
+        date_plan=date_plan,
+    )
+
+    def _chunks() -> Iterator[ColumnChunk]:
+        try:
+            offset = 0
+            if sample:
+                yield _convert_chunk(sample_frame, schema, offset)
+                offset += len(sample)
+            buffer: List[tuple] = []
+            for row in rows:
+                buffer.append(tuple(row))
+                if len(buffer) >= chunk_rows:
+                    yield _convert_chunk(_rows_to_frame(header, buffer), schema, offset)
+                    offset += len(buffer)
+                    buffer = []
+            if buffer:
+                yield _convert_chunk(_rows_to_frame(header, buffer), schema, offset)
+        finally:
+            xls.close()
+
+    return schema, _chunks()
+
+
+def load_excel_streaming(
+    path: str,
+    preferred_sheet: Optional[str] = None,
+    has_time_column: bool = True,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    sample_rows: int = DEFAULT_SAMPLE_ROWS,
+    config_path: Optional[str] = None,
+) -> ParsedExcel:
+    """流式读取并拼装为 ParsedExcel：只保留日期/指标/定位列的紧凑数组，适合超长烤机日志。"""
+    schema, chunks = iter_excel_chunks(
+        path,
+        preferred_sheet,
+        has_time_column=has_time_column,
+        chunk_rows=chunk_rows,
+        sample_rows=sample_rows,
+        config_path=config_path,
+    )
+    parts: Dict[str, List[np.ndarray]] = {col: [] for col in schema.columns}
+    for chunk in chunks:
+        for col in schema.columns:
+            parts[col].append(chunk[col])
+
+    data = {}
+    for col in schema.columns:
+        if parts[col]:
+            data[col] = np.concatenate(parts[col])
+        else:
+            data[col] = np.array([], dtype="datetime64[ns]" if col == schema.date_column else np.float64)
+        parts[col] = []
+    df = pd.DataFrame(data, columns=schema.columns, copy=False)
+
+    return ParsedExcel(
+        sheet_name=schema.sheet_name,
+        df=df,
+        date_column=schema.date_column,
+        numeric_columns=schema.numeric_columns,
+        available_sheets=schema.available_sheets,
+        units=schema.units,
+        column_display_names=schema.column_display_names,
+        location_columns=schema.location_columns,
+    )
@@ -5,7 +5,7 @@ from typing import List, Optional, Tuple
 
 from docx import Document
 
-SUPPORTED_EXCEL_EXTS = {".xlsx", ".xls"}
+SUPPORTED_EXCEL_EXTS = {".xlsx", ".xls", ".csv", ".parquet"}
 SUPPORTED_TEXT_EXTS = {".txt"}
 SUPPORTED_DOCX_EXTS = {".docx"}
 
@@ -46,14 +46,16 @@ def _read_docx(path: str) -> str:
     return "\n".join(lines).strip()
 
 
-def parse_uploads(uploaded) -> Tuple[Optional[str], str]:
-    excel_path: Optional[str] = None
+def parse_uploads_all(uploaded) -> Tuple[List[str], str]:
+    """返回全部数据文件路径（按上传顺序）与文档上下文，用于多文件合并分析。"""
+    data_paths: List[str] = []
     context_parts: List[str] = []
 
     for path in _normalize_uploaded_files(uploaded):
         ext = Path(path).suffix.lower()
-        if ext in SUPPORTED_EXCEL_EXTS and not excel_path:
-            excel_path = path
+        if ext in SUPPORTED_EXCEL_EXTS:
+            if path not in data_paths:
+                data_paths.append(path)
             continue
         if ext in SUPPORTED_TEXT_EXTS:
             content = _read_txt(path)
@@ -66,7 +68,12 @@ def parse_uploads(uploaded) -> Tuple[Optional[str], str]:
                 context_parts.append(content)
 
     context_text = "\n\n".join(context_parts).strip()
-    return excel_path, context_text
+    return data_paths, context_text
+
+
+def parse_uploads(uploaded) -> Tuple[Optional[str], str]:
+    data_paths, context_text = parse_uploads_all(uploaded)
+    return (data_paths[0] if data_paths else None), context_text
 
 
 def build_raw_file_context_section(context_text: str, limit_chars: int) -> str:
@@ -4,7 +4,7 @@ import argparse
 import os
 import sys
 import tempfile
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -21,9 +21,11 @@ import mammoth
 import requests
 
 from src.analysis import resolve_window, summarize_no_time_dataset
-from src.excel_parser import load_excel
-from src.file_ingest import build_raw_file_context_section, parse_uploads
+from src.excel_cache import load_excel_cached, load_excel_projected_cached
+from src.file_ingest import build_raw_file_context_section, parse_uploads_all
+from src.group_stats import location_group_stats, location_key_columns
 from src.indicator_resolver import resolve_prompt_metrics, resolve_selected_metrics
+from src.multi_ingest import load_excel_many
 from src.llm_client import (
     generate_conversation_summary,
     match_indicators_similarity,
@@ -40,6 +42,8 @@ from src.report_docx import (
     replace_summary_section,
 )
 from src.settings import get_config_path, get_output_dir
+from src.stats_memo import memoized_chart_data, memoized_window_stats
+from src.time_index import time_index_for
 
 CONFIG_PATH = get_config_path()
 DEFAULT_OUTPUT_DIR = get_output_dir()
@@ -67,6 +71,8 @@ def _build_summary_prompt_from_history(hist: ChatHistory) -> str:
 @dataclass
 class SessionState:
     excel_path: Optional[str] = None
+    # 多个数据文件（如每批次一个工作簿）同时上传时合并分析；excel_path 为其中第一个
+    excel_paths: List[str] = field(default_factory=list)
     parsed_excel = None
     pending_candidates: Optional[List[Dict[str, str]]] = None
     pending_prompt: Optional[str] = None
@@ -79,12 +85,15 @@ class SessionState:
     session_chart_data: Optional[List] = None
     # 当前综合总结正文，用于多轮「修改总结」时传入 LLM
     session_summary_text: Optional[str] = None
+    # 列投影加载：先只探测结构并读取日期列，解析出指标后再按需读取对应列；「全部指标」时才整表解析
+    projected_load: bool = True
 
 
 def _update_state_with_uploads(state: SessionState, uploads) -> SessionState:
-    excel_path, context_text = parse_uploads(uploads)
-    if excel_path:
-        state.excel_path = excel_path
+    data_paths, context_text = parse_uploads_all(uploads)
+    if data_paths:
+        state.excel_path = data_paths[0]
+        state.excel_paths = data_paths
         state.parsed_excel = None
     if context_text:
         state.context_text = context_text
@@ -93,20 +102,53 @@ def _update_state_with_uploads(state: SessionState, uploads) -> SessionState:
     return state
 
 
-def _load_parsed_excel(state: SessionState, sheet_name: Optional[str], use_llm: bool, has_time_column: bool):
-    if not state.excel_path:
-        raise ValueError("请先上传 Excel 文件")
-    if state.parsed_excel is None or sheet_name:
-        state.parsed_excel = load_excel(
+def _load_excel_for_state(
+    state: SessionState,
+    sheet_name: Optional[str],
+    use_llm: bool,
+    has_time_column: bool,
+    columns: Optional[List[str]] = None,
+):
+    """按会话加载模式读取 Excel：多文件时并行解析后合并；投影模式下只读取日期列与 columns，否则整表解析。"""
+    if len(state.excel_paths) > 1:
+        return load_excel_many(
+            state.excel_paths,
+            sheet_name,
+            config_path=CONFIG_PATH if use_llm else None,
+            use_llm_structure=use_llm,
+            has_time_column=has_time_column,
+        )
+    if state.projected_load:
+        return load_excel_projected_cached(
             state.excel_path,
+            columns or [],
             sheet_name,
             config_path=CONFIG_PATH if use_llm else None,
             use_llm_structure=use_llm,
             has_time_column=has_time_column,
         )
+    return load_excel_cached(
+        state.excel_path,
+        sheet_name,
+        config_path=CONFIG_PATH if use_llm else None,
+        use_llm_structure=use_llm,
+        has_time_column=has_time_column,
+    )
+
+
+def _load_parsed_excel(state: SessionState, sheet_name: Optional[str], use_llm: bool, has_time_column: bool):
+    if not state.excel_path:
+        raise ValueError("请先上传 Excel 文件")
+    if state.parsed_excel is None or sheet_name:
+        state.parsed_excel = _load_excel_for_state(state, sheet_name, use_llm, has_time_column)
     return state.parsed_excel
 
 
+def _requested_location_columns(prompt: str, location_columns: List[str]) -> List[str]:
+    """用户描述中点名的定位列（如 lot/wafer），投影加载时一并读取。"""
+    return [c for c in location_columns if c and c in prompt]
+
+
 def _combine_prompt(prompt: str, context_text: str, raw_file_context_section: str) -> str:
     prompt = (prompt or "").strip()
     parts: List[str] = []
@@ -120,16 +162,26 @@ def _combine_prompt(prompt: str, context_text: str, raw_file_context_section: st
     )
     return "\n\n".join(parts).strip()
 
+def _time_index(parsed_excel):
+    """与 /analyze 一致：日期列无法建立时间索引时报「未识别到有效日期列」。"""
+    try:
+        time_index = time_index_for(parsed_excel)
+    except TypeError:
+        raise ValueError("未识别到有效日期列")
+    if time_index.valid_count == 0:
+        raise ValueError("未识别到有效日期列")
+    return time_index
+
+
 def _resolve_time_window(
     prompt: str,
     parsed_excel,
     time_window_override: Optional[str],
     sheet_override: Optional[str],
 ) -> Tuple[Dict[str, str], Optional[str]]:
-    date_col = parsed_excel.date_column
-    df = parsed_excel.df
-    date_min = df[date_col].min()
-    date_max = df[date_col].max()
+    time_index = _time_index(parsed_excel)
+    date_min = time_index.date_min
+    date_max = time_index.date_max
     date_range = (date_min.date().isoformat(), date_max.date().isoformat())
 
     if time_window_override:
@@ -258,33 +310,62 @@ def _build_report_from_state(
         time_window_override,
         sheet_name,
     )
+    load_sheet = sheet_name
     if sheet_override and sheet_override != parsed_excel.sheet_name:
-        parsed_excel = load_excel(
-            state.excel_path,
-            sheet_override,
-            config_path=CONFIG_PATH if use_llm_structure else None,
-            use_llm_structure=use_llm_structure,
-            has_time_column=has_time_column,
-        )
+        load_sheet = sheet_override
+        parsed_excel = _load_excel_for_state(state, sheet_override, use_llm_structure, has_time_column)
         state.parsed_excel = parsed_excel
 
-    indicator_names, resolved_metrics, _ = _resolve_indicators(
+    indicator_names, resolved_metrics, all_requested = _resolve_indicators(
         prompt,
         parsed_excel,
         state.selected_indicators,
     )
 
+    if state.projected_load and len(state.excel_paths) <= 1:
+        if all_requested and len(resolved_metrics) == len(parsed_excel.numeric_columns):
+            # 仅「全部指标」时整表解析；指标列以整表识别结果为准。
+            parsed_excel = load_excel_cached(
+                state.excel_path,
+                load_sheet,
+                config_path=CONFIG_PATH if use_llm_structure else None,
+                use_llm_structure=use_llm_structure,
+                has_time_column=has_time_column,
+            )
+            resolved_metrics = list(parsed_excel.numeric_columns)
+        else:
+            # 提示词中提到的定位列，以及分组统计用的 lot / wafer 列
+            location_cols = _requested_location_columns(prompt, parsed_excel.location_columns)
+            location_cols += location_key_columns(parsed_excel.location_columns)
+            parsed_excel = _load_excel_for_state(
+                state,
+                load_sheet,
+                use_llm_structure,
+                has_time_column,
+                columns=list(dict.fromkeys(resolved_metrics + location_cols)),
+            )
+            if parsed_excel.loaded_columns is None:
+                # 整列与前几百行的结构探测不一致，已退回整表解析：只保留整表识别出的指标列
+                resolved_metrics = [m for m in resolved_metrics if m in parsed_excel.numeric_columns]
+                if not resolved_metrics:
+                    raise ValueError("所选指标在完整数据中不是数值列")
+                state.parsed_excel = parsed_excel
+
     date_col = parsed_excel.date_column
     df = parsed_excel.df
     if has_time_column:
-        date_max = df[date_col].max()
-        start, end, window_label = resolve_window(time_window, date_max)
-        filtered = df[(df[date_col] >= start) & (df[date_col] <= end)].copy()
+        time_index = _time_index(parsed_excel)
+        start, end, window_label = resolve_window(time_window, time_index.date_max)
+        filtered = time_index.window(start, end)
         if filtered.empty:
             raise ValueError("时间窗口内无数据")
     else:
         window_label = "全部样本（无时间列）"
         filtered = df.copy()
+        start = end = None
+    stats_by_metric = memoized_window_stats(parsed_excel, resolved_metrics, start, end, has_time_column)
+    chart_by_metric = memoized_chart_data(parsed_excel, filtered, resolved_metrics, start, end, has_time_column)
+    group_tables = location_group_stats(filtered, resolved_metrics, parsed_excel.location_columns)
 
     display_names = [parsed_excel.column_display_names.get(c, c) for c in resolved_metrics]
     report_path = SESSION_REPORT_PATH
@@ -303,6 +384,9 @@ def _build_report_from_state(
             units=parsed_excel.units,
             output_path=report_path,
             preface=no_time_preface,
+            stats_by_metric=stats_by_metric,
+            chart_by_metric=chart_by_metric,
+            group_tables=group_tables,
         )
         return report_path, window_label, display_names, chart_data, False
 
@@ -319,6 +403,9 @@ def _build_report_from_state(
         units=parsed_excel.units,
         chart_start_index=chart_start,
         preface=no_time_preface,
+        stats_by_metric=stats_by_metric,
+        chart_by_metric=chart_by_metric,
+        group_tables=group_tables,
     )
     return report_path, window_label, display_names, new_chart_data, True
 
@@ -532,7 +619,7 @@ def build_ui() -> gr.Blocks:
             with gr.Column(scale=3):
                 chatbot = gr.Chatbot(label="对话", elem_id="conversation-chatbot")
                 message = gr.Textbox(label="输入", lines=3, placeholder="例如：分析 2024Q4 产量趋势")
-                uploads = gr.Files(label="上传文件", file_types=[".xlsx", ".xls", ".docx", ".txt"],
+                uploads = gr.Files(label="上传文件", file_types=[".xlsx", ".xls", ".csv", ".parquet", ".docx", ".txt"],
                                     file_count="multiple")
                 sheet_name = gr.Textbox(label="Sheet 名称 (可选)")
                 time_window = gr.Textbox(label="时间窗口 (可选，YYYY-MM-DD 至 YYYY-MM-DD)")
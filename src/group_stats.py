@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.excel_parser import _normalize_column_name
+
+# 分组层级（由粗到细）及其列名匹配词；识别到的层级逐级嵌套，如 [lot] -> [lot, wafer]。
+_LEVEL_TOKENS = (
+    ("lot", frozenset({"lot", "lotid", "lotno", "批次", "批号"})),
+    ("wafer", frozenset({"wafer", "waferid", "waferno", "晶圆", "片号"})),
+)
+GROUP_STAT_KEYS = ("count", "mean", "std", "min", "median", "max")
+
+
+@dataclass
+class GroupStatsTable:
+    """一个分组层级的统计表：行为分组（按分组键排序），列为 (指标, 统计项) 两级索引。"""
+
+    keys: List[str]
+    table: pd.DataFrame
+
+    @property
+    def group_count(self) -> int:
+        return len(self.table)
+
+    @property
+    def label(self) -> str:
+        return " / ".join(self.keys)
+
+    def metric_table(self, metric: str) -> pd.DataFrame:
+        """单个指标的 分组 × 统计项 表。"""
+        return self.table[metric]
+
+
+def location_key_columns(location_columns: Sequence[str]) -> List[str]:
+    """按列名识别 lot / wafer 定位列，按由粗到细的顺序返回（每个层级取第一个匹配列）。"""
+    found: Dict[str, str] = {}
+    for col in location_columns:
+        normalized = _normalize_column_name(col)
+        for level, tokens in _LEVEL_TOKENS:
+            if level not in found and normalized in tokens:
+                found[level] = col
+    return [found[level] for level, _ in _LEVEL_TOKENS if level in found]
+
+
+def location_levels(df: pd.DataFrame, location_columns: Sequence[str]) -> List[List[str]]:
+    """返回嵌套的分组层级，如 [[lot], [lot, wafer]]；只考虑 df 中实际存在的定位列。"""
+    keys = location_key_columns([c for c in location_columns if c in df.columns])
+    return [keys[: i + 1] for i in range(len(keys))]
+
+
+def _group_means(count: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """各组均值；空组记为 0（输出时再置为 NaN）。"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), 0.0)
+
+
+def _finish(count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> Dict[str, np.ndarray]:
+    """由计数、均值与离差平方和（M2）得到输出的均值与样本标准差。"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = m2 / (count - 1)
+    return {
+        "mean": np.where(count > 0, mean, np.nan),
+        "std": np.where(count > 1, np.sqrt(np.maximum(var, 0.0)), np.nan),
+    }
+
+
+def grouped_stats(df: pd.DataFrame, metrics: Sequence[str], levels: Sequence[Sequence[str]]) -> List[GroupStatsTable]:
+    """按嵌套分组层级（如 [[lot], [lot, wafer]]）一次性计算各指标的 count/mean/std/min/median/max。
+
+    只按最细层级排序一次：最细层级的计数/和/极值用 reduceat 在连续分段上求得，
+    较粗层级直接由最细层级的分段结果再 reduceat 汇总；离差平方和在各层级按组两遍法计算
+    （组内行同样连续，一次 reduceat），不受组间水平差异影响；中位数每层级对全部指标按已排好的组号
+    做一次分组中位数（组号连续有序，无需再排序分组）。
+    分组键含缺失值的行不进入该层级的分组（与 pandas groupby 默认一致），但仍计入更粗的层级。
+    """
+    levels = [list(level) for level in levels if level]
+    metrics = [m for m in dict.fromkeys(metrics) if m in df.columns]
+    if not levels or not metrics or df.empty:
+        return []
+    finest = levels[-1]
+    for level in levels:
+        if level != finest[: len(level)]:
+            raise ValueError("分组层级必须逐级嵌套，如 [[lot], [lot, wafer]]")
+
+    # 缺失键单独成组（排序在各级末尾），保证较粗层级仍统计细层级键缺失的行；输出时再剔除
+    codes = df.groupby(finest, sort=True, observed=True, dropna=False).ngroup().to_numpy()
+    if len(codes) and codes.max() <= np.iinfo(np.uint16).max:
+        # 组数不超过 65536 时按 uint16 稳定排序，numpy 走基数排序
+        codes = codes.astype(np.uint16)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    key_frame = df[finest].iloc[order[starts]].reset_index(drop=True)
+    key_missing = key_frame.isna()
+
+    # 各层级在最细分组序列上的分段起点、每行所属的该层级分组号，以及键完整的分组
+    level_parts = []
+    for level in levels:
+        if len(level) == len(finest):
+            group_starts = np.arange(len(starts))
+        else:
+            prefix = key_frame[level].astype(object).where(~key_missing[level], None)
+            changed = (prefix.iloc[1:].to_numpy() != prefix.iloc[:-1].to_numpy()).any(axis=1)
+            group_starts = np.flatnonzero(np.r_[True, changed])
+        row_starts = starts[group_starts]
+        row_groups = np.repeat(np.arange(len(group_starts)), np.diff(np.r_[row_starts, order.size]))
+        complete = ~key_missing[level].iloc[group_starts].any(axis=1).to_numpy()
+        level_parts.append((level, group_starts, row_groups, complete))
+
+    # 所有指标按分组顺序排成一个列块，中位数每层级对整块一次求出
+    block = np.empty((order.size, len(metrics)), dtype=np.float64, order="F")
+    for j, metric in enumerate(metrics):
+        block[:, j] = pd.to_numeric(df[metric], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)[order]
+    medians = [
+        pd.DataFrame(block, copy=False).groupby(row_groups, sort=False).median().to_numpy()
+        for _, _, row_groups, _ in level_parts
+    ]
+
+    results: Dict[int, Dict[tuple, np.ndarray]] = {i: {} for i in range(len(levels))}
+    for j, metric in enumerate(metrics):
+        values = block[:, j]
+        valid = ~np.isnan(values)
+        base = {
+            "count": np.add.reduceat(valid.astype(np.int64), starts),
+            "sum": np.add.reduceat(np.where(valid, values, 0.0), starts),
+            "min": np.minimum.reduceat(np.where(valid, values, np.inf), starts),
+            "max": np.maximum.reduceat(np.where(valid, values, -np.inf), starts),
+        }
+        for i, (level, group_starts, row_groups, _) in enumerate(level_parts):
+            if len(group_starts) == len(starts):
+                agg = dict(base)
+            else:
+                agg = {
+                    "count": np.add.reduceat(base["count"], group_starts),
+                    "sum": np.add.reduceat(base["sum"], group_starts),
+                    "min": np.minimum.reduceat(base["min"], group_starts),
+                    "max": np.maximum.reduceat(base["max"], group_starts),
+                }
+            agg["mean"] = _group_means(agg["count"], agg["sum"])
+            # 两遍法：每行减去所在组的均值后再累加平方和，避免 Σx² - (Σx)²/n 在组均值较大时相消
+            centered = np.where(valid, values - agg["mean"][row_groups], 0.0)
+            agg["m2"] = np.add.reduceat(centered * centered, starts[group_starts])
+            count = agg["count"]
+            moments = _finish(count, agg["mean"], agg["m2"])
+            empty = count == 0
+            columns = results[i]
+            columns[(metric, "count")] = count
+            columns[(metric, "mean")] = moments["mean"]
+            columns[(metric, "std")] = moments["std"]
+            columns[(metric, "min")] = np.where(empty, np.nan, agg["min"])
+            columns[(metric, "median")] = medians[i][:, j]
+            columns[(metric, "max")] = np.where(empty, np.nan, agg["max"])
+
+    tables: List[GroupStatsTable] = []
+    for i, (level, group_starts, _, complete) in enumerate(level_parts):
+        keys = key_frame[level].iloc[group_starts[complete]]
+        index = pd.MultiIndex.from_frame(keys) if len(level) > 1 else pd.Index(keys[level[0]], name=level[0])
+        table = pd.DataFrame({col: values[complete] for col, values in results[i].items()}, index=index)
+        table.columns = pd.MultiIndex.from_tuples(table.columns, names=["metric", "stat"])
+        tables.append(GroupStatsTable(keys=list(level), table=table))
+    return tables
+
+
+def location_group_stats(
+    df: pd.DataFrame,
+    metrics: Sequence[str],
+    location_columns: Sequence[str],
+) -> List[GroupStatsTable]:
+    """按识别到的 lot / wafer 定位列做分组统计；没有可用定位列时返回空列表。"""
+    return grouped_stats(df, metrics, location_levels(df, location_columns))
+
+
+def top_bottom_groups(table: pd.DataFrame, limit: int) -> Optional[pd.DataFrame]:
+    """分组过多时只保留均值最高与最低各 limit//2 组（按均值降序）；不超过 limit 组时原样返回。"""
+    if table.empty:
+        return None
+    if len(table) <= limit:
+        return table
+    ranked = table.sort_values("mean", ascending=False, kind="stable")
+    half = max(1, limit // 2)
+    return pd.concat([ranked.head(half), ranked.tail(half)])
@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.excel_engines import pandas_compatible_cell
+from src.excel_parser import SAMPLE_INDEX_COLUMN, ParsedExcel, _coerce_datetime, sample_index_dates
+
+# 跟踪的文件数上限；每个条目持有一份已解析的 DataFrame。
+_MAX_TRACKED_FILES = 16
+_HASH_CHUNK_BYTES = 4 * 1024 * 1024
+_APPENDABLE_EXTS = {".xlsx", ".xlsm", ".csv"}
+
+# (绝对路径, sheet, use_llm_structure, has_time_column)
+StateKey = Tuple[str, Optional[str], bool, bool]
+
+
+@dataclass
+class AppendState:
+    """增量加载状态：上次解析结果及其对应的文件身份与行数。"""
+
+    parsed: ParsedExcel
+    header: List[str]
+    row_count: int
+    file_size: int
+    mtime_ns: int
+    # CSV：已解析部分的字节摘要，用于确认只在文件末尾追加。
+    prefix_digest: Optional[str] = None
+    # xlsx：已解析行的内容指纹（见 _xlsx_fingerprint）及当时的共享字符串条数。
+    sheet_fingerprint: Optional[str] = None
+    shared_count: int = 0
+
+
+_states: "OrderedDict[StateKey, AppendState]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _state_key(path: str, sheet_name: Optional[str], use_llm_structure: bool, has_time_column: bool) -> StateKey:
+    return (os.path.abspath(path), sheet_name or None, bool(use_llm_structure), bool(has_time_column))
+
+
+def _file_digest(path: str) -> Tuple[str, bool]:
+    """返回 (整文件摘要, 是否以换行结尾)。"""
+    digest = hashlib.blake2b(digest_size=20)
+    last = b""
+    with open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(_HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+            last = chunk[-1:]
+    return digest.hexdigest(), last == b"\n"
+
+
+def remember(
+    path: str,
+    sheet_name: Optional[str],
+    use_llm_structure: bool,
+    has_time_column: bool,
+    parsed: ParsedExcel,
+) -> None:
+    """完整解析后登记状态，供下次文件增长时只解析新增行。仅跟踪整表加载的 xlsx/csv。"""
+    if Path(path).suffix.lower() not in _APPENDABLE_EXTS or parsed.loaded_columns is not None:
+        return
+    stat = os.stat(path)
+    state = AppendState(
+        parsed=parsed,
+        header=[str(c) for c in parsed.df.columns if c != SAMPLE_INDEX_COLUMN],
+        row_count=len(parsed.df),
+        file_size=int(stat.st_size),
+        mtime_ns=int(stat.st_mtime_ns),
+    )
+    if Path(path).suffix.lower() == ".csv":
+        digest, ends_with_newline = _file_digest(path)
+        if not ends_with_newline:
+            # 末行没有换行符时无法区分「追加新行」与「续写末行」，不做增量。
+            return
+        state.prefix_digest = digest
+    else:
+        book = _open_xlsx(path)
+        try:
+            state.shared_count = len(book.shared_strings)
+            state.sheet_fingerprint = _xlsx_fingerprint(book, parsed.sheet_name, state.row_count, state.shared_count)
+        finally:
+            book.close()
+        if state.sheet_fingerprint is None:
+            return
+    key = _state_key(path, sheet_name, use_llm_structure, has_time_column)
+    with _lock:
+        _states[key] = state
+        _states.move_to_end(key)
+        while len(_states) > _MAX_TRACKED_FILES:
+            _states.popitem(last=False)
+
+
+def forget(path: Optional[str] = None) -> None:
+    """丢弃增量状态；不传 path 时全部清空。"""
+    with _lock:
+        if path is None:
+            _states.clear()
+            return
+        abs_path = os.path.abspath(path)
+        for key in [k for k in _states if k[0] == abs_path]:
+            del _states[key]
+
+
+def _convert_rows(frame: pd.DataFrame, parsed: ParsedExcel, start_row: int) -> pd.DataFrame:
+    """按已识别的结构转换新读入的行：日期列解析、指标列转数值，列顺序与已有 df 一致。"""
+    frame = frame.copy()
+    if parsed.date_column == SAMPLE_INDEX_COLUMN:
+        frame[SAMPLE_INDEX_COLUMN] = sample_index_dates(len(frame), start=start_row)
+    elif parsed.date_column in frame.columns:
+        frame[parsed.date_column] = _coerce_datetime(frame[parsed.date_column])
+    for col in parsed.numeric_columns:
+        if col in frame.columns:
+            frame[col] = pd.to_numeric(frame[col], errors="coerce")
+    frame.columns = list(parsed.df.columns)
+    return frame
+
+
+def _open_xlsx(path: str):
+    from openpyxl import load_workbook
+
+    return load_workbook(path, read_only=True, data_only=True)
+
+
+def _hash_sheet_prefix(archive, part: str, last_row: int, digest) -> bool:
+    """把工作表 XML 中从 <sheetData 起到第 last_row 行的 </row> 为止的字节流式写入 digest。
+
+    之前的 <dimension> 等元素会随追加变化，不参与摘要；找不到该行（如写入方未标注 r 属性）时返回 False。
+    """
+    markers = [b"<sheetData", f'<row r="{last_row}"'.encode("ascii"), b"</row>"]
+    stage = 0
+    buffer = b""
+    with archive.open(part) as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_BYTES), b""):
+            buffer += chunk
+            offset = 0
+            while stage < len(markers):
+                pos = buffer.find(markers[stage], offset)
+                if pos < 0:
+                    break
+                if stage == 0:
+                    buffer, pos = buffer[pos:], 0
+                offset = pos + len(markers[stage])
+                stage += 1
+            if stage == len(markers):
+                digest.update(buffer[:offset])
+                return True
+            # 保留可能跨块的标记前缀，其余字节已扫描完毕
+            cut = max(offset, len(buffer) - len(markers[stage]) + 1)
+            if stage > 0:
+                digest.update(buffer[:cut])
+            buffer = buffer[cut:]
+    return False
+
+
+def _xlsx_fingerprint(book, sheet_name: str, row_count: int, shared_count: int) -> Optional[str]:
+    """表头与前 row_count 个数据行的内容指纹。
+
+    由三部分组成：工作表 XML 中这些行的原始字节、它们可能引用的前 shared_count 个共享字符串，
+    以及 styles.xml（日期/数字格式）。只在末尾追加行时指纹不变；已有行的值或格式被改动时随之变化。
+    依赖 openpyxl 只读模式的内部属性，取不到时返回 None（调用方按完整重新解析处理）。
+    """
+    archive = getattr(book, "_archive", None)
+    if sheet_name not in book.sheetnames or archive is None:
+        return None
+    part = getattr(book[sheet_name], "_worksheet_path", None)
+    strings = book.shared_strings
+    if part is None or len(strings) < shared_count:
+        return None
+    digest = hashlib.blake2b(digest_size=20)
+    if not _hash_sheet_prefix(archive, part, row_count + 1, digest):
+        return None
+    for i in range(shared_count):
+        digest.update(str(strings[i]).encode("utf-8"))
+        digest.update(b"\x00")
+    if "xl/styles.xml" in archive.namelist():
+        digest.update(archive.read("xl/styles.xml"))
+    return digest.hexdigest()
+
+
+def _read_xlsx_rows(book, state: AppendState, start_row: int) -> Optional[pd.DataFrame]:
+    """只读模式读取表头与第 start_row 个数据行之后的全部行；表头变化时返回 None。"""
+    from src.excel_stream import _normalize_header
+
+    if state.parsed.sheet_name not in book.sheetnames:
+        return None
+    sheet = book[state.parsed.sheet_name]
+    sheet.reset_dimensions()
+    header_row = next(sheet.iter_rows(max_row=1, values_only=True), ())
+    values = list(header_row)
+    while values and values[-1] is None:
+        values.pop()
+    if _normalize_header(values) != state.header:
+        return None
+    width = len(state.header)
+    rows = []
+    last_with_data = -1
+    for row in sheet.iter_rows(min_row=start_row + 2, values_only=True):
+        cells = [pandas_compatible_cell(v) for v in row[:width]]
+        cells.extend([np.nan] * (width - len(cells)))
+        if any(v is not np.nan for v in cells):
+            last_with_data = len(rows)
+        rows.append(cells)
+    rows = rows[: last_with_data + 1]
+    return pd.DataFrame.from_records(rows, columns=state.header) if rows else pd.DataFrame(columns=state.header)
+
+
+def _xlsx_tail(path: str, state: AppendState) -> Optional[Tuple[pd.DataFrame, str, int]]:
+    """校验已解析的全部行（及其引用的字符串与格式）未变后，只读取并转换新增行。
+
+    返回 (新增行, 追加后全部行的指纹, 当前共享字符串条数)；校验不通过时返回 None。
+    """
+    sheet_name = state.parsed.sheet_name
+    book = _open_xlsx(path)
+    try:
+        fingerprint = _xlsx_fingerprint(book, sheet_name, state.row_count, state.shared_count)
+        if fingerprint is None or fingerprint != state.sheet_fingerprint:
+            return None
+        frame = _read_xlsx_rows(book, state, state.row_count)
+        if frame is None:
+            return None
+        shared_count = len(book.shared_strings)
+        new_fingerprint = _xlsx_fingerprint(book, sheet_name, state.row_count + len(frame), shared_count)
+        if new_fingerprint is None:
+            return None
+    finally:
+        book.close()
+    return _convert_rows(frame, state.parsed, state.row_count), new_fingerprint, shared_count
+
+
+def _csv_tail(path: str, state: AppendState, new_size: int) -> Optional[Tuple[pd.DataFrame, str]]:
+    """校验已解析字节未变后，只解析新增的字节；返回 (新增行, 新的整文件摘要)。"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as handle:
+        remaining = state.file_size
+        while remaining > 0:
+            chunk = handle.read(min(_HASH_CHUNK_BYTES, remaining))
+            if not chunk:
+                return None
+            digest.update(chunk)
+            remaining -= len(chunk)
+        if digest.hexdigest() != state.prefix_digest:
+            return None
+        tail_bytes = handle.read()
+    if not tail_bytes.endswith(b"\n"):
+        return None
+    digest.update(tail_bytes)
+    try:
+        frame = pd.read_csv(io.BytesIO(tail_bytes), header=None, names=state.header)
+    except UnicodeDecodeError:
+        frame = pd.read_csv(io.BytesIO(tail_bytes), header=None, names=state.header, encoding="gb18030")
+    return _convert_rows(frame, state.parsed, state.row_count), digest.hexdigest()
+
+
+def try_append(
+    path: str,
+    sheet_name: Optional[str],
+    use_llm_structure: bool,
+    has_time_column: bool,
+) -> Optional[ParsedExcel]:
+    """文件只在末尾追加了新行时，只解析新增行并原地更新已登记的 ParsedExcel。
+
+    返回更新后的 ParsedExcel（与登记时为同一对象，df 替换为拼接后的新 DataFrame）；
+    未登记、文件被截断、表头或已有行内容变化时返回 None，由调用方完整重新解析。
+    结构（日期列/指标列/单位）沿用首次解析结果，不会因新增行重新识别。
+    """
+    key = _state_key(path, sheet_name, use_llm_structure, has_time_column)
+    stat = os.stat(path)
+    new_size, new_mtime = int(stat.st_size), int(stat.st_mtime_ns)
+    with _lock:
+        state = _states.get(key)
+        if state is None:
+            return None
+        if new_size == state.file_size and new_mtime == state.mtime_ns:
+            return state.parsed
+        # 取出状态后释放锁再读文件：同一文件的并发调用拿不到状态、各自完整解析，其他文件不受影响
+        del _states[key]
+
+    is_csv = Path(path).suffix.lower() == ".csv"
+    if is_csv and new_size < state.file_size:
+        return None
+    try:
+        if is_csv:
+            result = _csv_tail(path, state, new_size)
+            if result is None:
+                return None
+            tail, state.prefix_digest = result
+        else:
+            result = _xlsx_tail(path, state)
+            if result is None:
+                return None
+            tail, state.sheet_fingerprint, state.shared_count = result
+    except Exception:
+        return None
+
+    parsed = state.parsed
+    if not tail.empty:
+        parsed.df = pd.concat([parsed.df, tail], ignore_index=True)
+    state.row_count = len(parsed.df)
+    state.file_size = new_size
+    state.mtime_ns = new_mtime
+    with _lock:
+        # 期间若有并发的完整解析已重新登记，保留较新的那份
+        if key not in _states:
+            _states[key] = state
+            while len(_states) > _MAX_TRACKED_FILES:
+                _states.popitem(last=False)
+    return parsed
@@ -1,4 +1,5 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
@@ -17,6 +18,8 @@ class LLMConfig:
     api_base_url: str
     api_key: str
     raw_file_context_limit_chars: int
+    structure_batch_columns: int = 80
+    structure_max_parallel: int = 4
 
 
 def _load_config(config_path: str) -> LLMConfig:
@@ -82,6 +85,8 @@ def _load_config(config_path: str) -> LLMConfig:
         api_base_url=api_base_url,
         api_key=api_key or provider_name,
         raw_file_context_limit_chars=raw_file_context_limit_chars,
+        structure_batch_columns=max(1, int(data.get("STRUCTURE_BATCH_COLUMNS", 80) or 80)),
+        structure_max_parallel=max(1, int(data.get("STRUCTURE_MAX_PARALLEL", 4) or 4)),
     )
 
 
@@ -336,33 +341,29 @@ def _parse_response_json(text: str) -> Dict[str, Any]:
     return json.loads(candidate)
 
 
-def analyze_excel_structure(
-    config_path: str,
+def _analyze_structure_batch(
+    config: LLMConfig,
     column_names: List[str],
     sample_by_column: Dict[str, List[Any]],
-    max_sample_values: int = 5,
+    max_sample_values: int,
 ) -> Dict[str, Any]:
-    """
-    由 LLM 根据列名与每列样本值推断：哪一列是日期列、哪些是数值指标列及展示名。
-    返回: { "date_column": str, "numeric_columns": [ {"column": str, "display_name": str}, ... ] }
-    """
-    config = _load_config(config_path)
+    """对一批列调用一次结构识别；本批没有日期列时 date_column 为 null。"""
     system_prompt = (
         "你是数据分析助手。根据表格的「列名」和「每列前几条样本值」，推断表格结构。"
-        "规则：1）日期列：仅选一列作为时间轴，该列应主要为日期或可解析为日期。"
+        "规则：1）日期列：仅选一列作为时间轴，该列应主要为日期或可解析为日期；给出的列中没有日期列时返回 null。"
         "2）数值指标列：列出所有表示业务数值的列（产量、率、价格、指数等），不要选纯日期列或明显为编号/ID 的列。"
         "3）若存在「名称列+数值列」成对（如一列是指标名、下一列是对应数值），只把「数值列」列入 numeric_columns，display_name 可用相邻名称列的内容或简写。"
         "4）display_name 用于报告与图表，无歧义时可与 column 相同。"
         "输出严格 JSON，不要多余文字。"
     )
     sample_text_parts = []
-    for col in column_names[:80]:
+    for col in column_names:
         vals = sample_by_column.get(col, [])[:max_sample_values]
         vals_str = [str(v)[:30] for v in vals]
         sample_text_parts.append(f"  {col}: {vals_str}")
     sample_text = "\n".join(sample_text_parts)
     expected = {
-        "date_column": "string（唯一作为时间轴的列名）",
+        "date_column": "string 或 null（唯一作为时间轴的列名）",
         "numeric_columns": [{"column": "string", "display_name": "string"}],
     }
     user_content = (
@@ -381,6 +382,75 @@ def analyze_excel_structure(
     return parsed
 
 
+def _merge_structure_batches(
+    batches: List[List[str]],
+    results: List[Dict[str, Any]],
+    date_column_hint: Optional[str],
+) -> Dict[str, Any]:
+    """按批次顺序合并各批结果：数值列去重并只保留本批内的列；日期列在各批提名中统一选定一列。
+
+    提名中包含启发式日期列（date_column_hint）时优先采用，否则取列顺序最靠前的提名。
+    """
+    date_votes: List[str] = []
+    numeric_columns: List[Dict[str, str]] = []
+    seen = set()
+    for batch, result in zip(batches, results):
+        allowed = set(batch)
+        date_col = result.get("date_column")
+        if isinstance(date_col, str) and date_col in allowed:
+            date_votes.append(date_col)
+        items = result.get("numeric_columns")
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            col = item.get("column")
+            if not col or str(col) not in allowed or str(col) in seen:
+                continue
+            seen.add(str(col))
+            numeric_columns.append({"column": str(col), "display_name": item.get("display_name") or str(col)})
+
+    date_column: Optional[str] = None
+    if date_column_hint and date_column_hint in date_votes:
+        date_column = date_column_hint
+    elif date_votes:
+        date_column = date_votes[0]
+    if date_column:
+        numeric_columns = [item for item in numeric_columns if item["column"] != date_column]
+    return {"date_column": date_column, "numeric_columns": numeric_columns}
+
+
+def analyze_excel_structure(
+    config_path: str,
+    column_names: List[str],
+    sample_by_column: Dict[str, List[Any]],
+    max_sample_values: int = 5,
+    date_column_hint: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    由 LLM 根据列名与每列样本值推断：哪一列是日期列、哪些是数值指标列及展示名。
+    宽表按 STRUCTURE_BATCH_COLUMNS 分批，最多 STRUCTURE_MAX_PARALLEL 个请求并发，结果按列顺序确定性合并。
+    返回: { "date_column": str, "numeric_columns": [ {"column": str, "display_name": str}, ... ] }
+    """
+    config = _load_config(config_path)
+    size = config.structure_batch_columns
+    batches = [column_names[i:i + size] for i in range(0, len(column_names), size)]
+    if len(batches) <= 1:
+        results = [_analyze_structure_batch(config, column_names, sample_by_column, max_sample_values)]
+        batches = [list(column_names)]
+    else:
+        workers = min(config.structure_max_parallel, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(
+                pool.map(
+                    lambda batch: _analyze_structure_batch(config, batch, sample_by_column, max_sample_values),
+                    batches,
+                )
+            )
+    return _merge_structure_batches(batches, results, date_column_hint)
+
+
 def parse_prompt(
     config_path: str,
     user_prompt: str,
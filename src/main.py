@@ -7,12 +7,18 @@ from fastapi import FastAPI, Form, HTTPException
 from pydantic import BaseModel, Field
 
 from src.analysis import resolve_window, summarize_no_time_dataset
-from src.excel_parser import load_excel
+from src.excel_cache import PARSED_EXCEL_CACHE, load_excel_cached, probe_excel_schema_cached
+from src.excel_parser import compact_parsed_excel
+from src.group_stats import location_group_stats
 from src.indicator_resolver import resolve_prompt_metrics, resolve_selected_metrics
 from src.llm_client import match_indicators_similarity, parse_prompt
+from src.multi_ingest import load_excel_many
 from src.report_docx import build_report
+from src import structure_cache
 from src.settings import get_config_path, get_output_dir
-from src.table_preprocess import parse_table_columns
+from src.stats_memo import STATS_MEMO, memoized_chart_data, memoized_window_stats
+from src.table_preprocess import breakdown_table_columns_file
+from src.time_index import time_index_for
 
 
 def _indicator_phrases_from_prompt(user_prompt: str) -> List[str]:
@@ -53,12 +59,15 @@ def _column_matches_prompt(column_name: str, user_prompt: str) -> bool:
 
 class AnalyzeRequest(BaseModel):
     excel_path: str = Field(default="D:/codes/data_analysis/data/test.xlsx")
+    excel_paths: Optional[List[str]] = Field(default=None, description="多个数据文件（如每批次一个工作簿）合并分析，行上追加 source_file 来源列；提供多个时忽略 excel_path")
     user_prompt: str = Field(..., min_length=1)
     sheet_name: Optional[str] = None
     output_dir: str = Field(default_factory=get_output_dir)
     selected_indicator_names: Optional[List[str]] = None
     use_llm_structure: bool = Field(default=True, description="用 LLM 推断 Excel 日期/数值列结构，适配任意表格式；设为 false 则使用启发式规则")
     has_time_column: bool = Field(default=True, description="数据是否包含可用时间列；false 时将启用无时间列分析流程")
+    compact_dtypes: bool = Field(default=False, description="紧凑内存模式：指标列无损时降为 float32、定位列分类编码、丢弃未识别的文本列")
+    location_breakdown: bool = Field(default=True, description="识别到 lot / wafer 定位列时，在报告中追加各指标的分组统计表")
 
 
 class AnalyzeResponse(BaseModel):
@@ -69,6 +78,10 @@ class AnalyzeResponse(BaseModel):
     date_column: str
     analysis_mode: str
     agent_message: str
+    memory_bytes_before: Optional[int] = None
+    memory_bytes_after: Optional[int] = None
+    reader_engine: Optional[str] = None
+    read_seconds: Optional[float] = None
 
 
 def _build_agent_message(
@@ -123,7 +136,7 @@ class RuntimeConfigResponse(BaseModel):
 
 
 class PreprocessRequest(BaseModel):
-    file_path: str = Field(..., description="表格路径，支持 csv/xlsx/xls")
+    file_path: str = Field(..., description="表格路径，支持 csv/parquet/xlsx/xls")
     sheet_name: Optional[str] = None
     threshold: int = Field(default=10, ge=1, description="唯一值阈值，小于等于该值判定为定位列")
 
@@ -131,6 +144,8 @@ class PreprocessRequest(BaseModel):
 class PreprocessResponse(BaseModel):
     location_columns: List[str]
     value_columns: List[str]
+    null_like_counts: Dict[str, int] = Field(default_factory=dict, description="每列空值/空值类文本的数量")
+    unique_counts: Dict[str, int] = Field(default_factory=dict, description="每列非空唯一值数量")
 
 
 app = FastAPI(title="Data Analysis Agent")
@@ -197,6 +212,41 @@ async def config_runtime() -> RuntimeConfigResponse:
                 description="覆盖报告输出目录 data/reports",
                 location="环境变量",
             ),
+            ConfigOptionItem(
+                key="DATA_ANALYSIS_PARSED_CACHE_MB",
+                description="已解析工作簿 LRU 缓存的内存上限（MB，默认 512，0 为禁用）",
+                location="环境变量",
+            ),
+            ConfigOptionItem(
+                key="DATA_ANALYSIS_SNAPSHOT_DIR",
+                description="列式快照目录（默认 data/snapshots，设为 off 禁用）",
+                location="环境变量",
+            ),
+            ConfigOptionItem(
+                key="DATA_ANALYSIS_STRUCTURE_CACHE_DIR",
+                description="LLM 表结构识别结果缓存目录（默认 data/structure_cache，设为 off 禁用）",
+                location="环境变量",
+            ),
+            ConfigOptionItem(
+                key="DATA_ANALYSIS_STRUCTURE_CACHE_MAX",
+                description="LLM 表结构缓存条目上限（默认 500，超出按最久未使用淘汰）",
+                location="环境变量",
+            ),
+            ConfigOptionItem(
+                key="DATA_ANALYSIS_STATS_MEMO_MAX",
+                description="统计量/图表数据记忆化缓存条目上限（默认 512，0 为禁用），命中情况见 /cache/stats",
+                location="环境变量",
+            ),
+            ConfigOptionItem(
+                key="DATA_ANALYSIS_EXCEL_ENGINE",
+                description="Excel 读取引擎：auto（默认，按文件大小与维度选择）/openpyxl/openpyxl_stream/calamine/xlrd",
+                location="环境变量",
+            ),
+            ConfigOptionItem(
+                key="DATA_ANALYSIS_STREAM_LOAD_MB",
+                description="不小于该大小（MB，默认 100，0 为禁用）的 .xlsx 改用流式分块读取，只保留日期/指标/定位列",
+                location="环境变量",
+            ),
             ConfigOptionItem(
                 key="API_TIMEOUT_MS",
                 description="调用模型服务的超时毫秒数",
@@ -221,18 +271,47 @@ async def config_runtime() -> RuntimeConfigResponse:
     )
 
 
+@app.delete("/cache/structure")
+async def invalidate_structure_cache(fingerprint: Optional[str] = None) -> Dict[str, int]:
+    """失效 LLM 表结构缓存：指定 fingerprint 时只删除该条目，否则清空全部。"""
+    return {"removed": structure_cache.invalidate(fingerprint)}
+
+
+@app.get("/cache/stats")
+async def cache_stats() -> Dict[str, Dict[str, int]]:
+    """各级缓存的条目数与命中/未命中计数，便于调整容量。"""
+    return {
+        "parsed_excel": PARSED_EXCEL_CACHE.stats(),
+        "structure": structure_cache.stats(),
+        "stats_memo": STATS_MEMO.stats(),
+    }
+
+
+@app.delete("/cache/stats")
+async def clear_stats_memo() -> Dict[str, int]:
+    """清空统计量/图表数据记忆化缓存（不影响已解析工作簿缓存）。"""
+    cleared = STATS_MEMO.stats()["entries"]
+    STATS_MEMO.clear()
+    return {"removed": cleared}
+
+
 @app.post("/analyze/match", response_model=MatchResponse)
 async def analyze_match(
     excel_path: str = Form(default="D:/codes/data_analysis/data/test.xlsx"),
     user_prompt: str = Form(default=""),
     sheet_name: Optional[str] = Form(default=None),
     use_llm_structure: bool = Form(default=True),
+    schema_only: bool = Form(default=True),
 ) -> MatchResponse:
-    """根据用户描述做指标相似匹配；若歧义则返回候选列表供前端展示、用户选择后再调 /analyze 并传 selected_indicator_names。"""
+    """根据用户描述做指标相似匹配；若歧义则返回候选列表供前端展示、用户选择后再调 /analyze 并传 selected_indicator_names。
+
+    schema_only=True（默认）时只读取表头与少量样本行完成列分类，耗时与数据行数无关。
+    """
     if not user_prompt.strip():
         return MatchResponse(status="not_found", message="请提供分析描述")
+    load = probe_excel_schema_cached if schema_only else load_excel_cached
     try:
-        parsed_excel = load_excel(
+        structure = load(
             excel_path,
             sheet_name,
             config_path=CONFIG_PATH if use_llm_structure else None,
@@ -242,8 +321,8 @@ async def analyze_match(
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"读取 Excel 失败: {exc}")
     columns_with_display = [
-        {"display": parsed_excel.column_display_names.get(c, c), "column": c}
-        for c in parsed_excel.numeric_columns
+        {"display": structure.column_display_names.get(c, c), "column": c}
+        for c in structure.numeric_columns
     ]
     try:
         result = match_indicators_similarity(
@@ -267,23 +346,39 @@ async def analyze_match(
 @app.post("/analyze", response_model=AnalyzeResponse)
 async def analyze(request: AnalyzeRequest) -> AnalyzeResponse:
     try:
-        parsed_excel = load_excel(
-            request.excel_path,
-            request.sheet_name,
-            config_path=CONFIG_PATH if request.use_llm_structure else None,
-            use_llm_structure=request.use_llm_structure,
-            has_time_column=request.has_time_column,
-        )
+        if request.excel_paths and len(request.excel_paths) > 1:
+            parsed_excel = load_excel_many(
+                request.excel_paths,
+                request.sheet_name,
+                config_path=CONFIG_PATH if request.use_llm_structure else None,
+                use_llm_structure=request.use_llm_structure,
+                has_time_column=request.has_time_column,
+            )
+            if request.compact_dtypes:
+                parsed_excel = compact_parsed_excel(parsed_excel)
+        else:
+            parsed_excel = load_excel_cached(
+                request.excel_paths[0] if request.excel_paths else request.excel_path,
+                request.sheet_name,
+                config_path=CONFIG_PATH if request.use_llm_structure else None,
+                use_llm_structure=request.use_llm_structure,
+                has_time_column=request.has_time_column,
+                compact=request.compact_dtypes,
+            )
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"读取 Excel 失败: {exc}")
 
     df = parsed_excel.df
     date_col = parsed_excel.date_column
-    if df[date_col].dropna().empty:
+    try:
+        time_index = time_index_for(parsed_excel)
+    except TypeError:
+        raise HTTPException(status_code=400, detail="未识别到有效日期列")
+    if time_index.valid_count == 0:
         raise HTTPException(status_code=400, detail="未识别到有效日期列")
 
-    date_min = df[date_col].min()
-    date_max = df[date_col].max()
+    date_min = time_index.date_min
+    date_max = time_index.date_max
     date_range = (date_min.date().isoformat(), date_max.date().isoformat())
     analysis_mode = "time_series" if request.has_time_column else "no_time"
 
@@ -366,13 +461,22 @@ async def analyze(request: AnalyzeRequest) -> AnalyzeResponse:
     if request.has_time_column:
         time_window = parsed_prompt.get("time_window") or {"type": "relative", "value": "最近一年"}
         start, end, window_label = resolve_window(time_window, date_max)
-        filtered = df[(df[date_col] >= start) & (df[date_col] <= end)].copy()
+        filtered = time_index.window(start, end)
         if filtered.empty:
             raise HTTPException(status_code=400, detail="时间窗口内无数据")
     else:
         time_window = {"type": "sample_index", "value": "全部样本"}
         window_label = "全部样本（无时间列）"
         filtered = df.copy()
+        start = end = None
+    stats_by_metric = memoized_window_stats(parsed_excel, resolved_metrics, start, end, request.has_time_column)
+    chart_by_metric = memoized_chart_data(parsed_excel, filtered, resolved_metrics, start, end, request.has_time_column)
+
+    group_tables = (
+        location_group_stats(filtered, resolved_metrics, parsed_excel.location_columns)
+        if request.location_breakdown
+        else None
+    )
 
     no_time_preface = summarize_no_time_dataset(filtered, resolved_metrics) if not request.has_time_column else None
     report_path, _ = build_report(
@@ -385,6 +489,9 @@ async def analyze(request: AnalyzeRequest) -> AnalyzeResponse:
         config_path=CONFIG_PATH,
         units=parsed_excel.units,
         preface=no_time_preface,
+        stats_by_metric=stats_by_metric,
+        chart_by_metric=chart_by_metric,
+        group_tables=group_tables,
     )
 
     display_names = [parsed_excel.column_display_names.get(c, c) for c in resolved_metrics]
@@ -403,6 +510,10 @@ async def analyze(request: AnalyzeRequest) -> AnalyzeResponse:
         date_column=date_col,
         analysis_mode=analysis_mode,
         agent_message=agent_message,
+        memory_bytes_before=parsed_excel.memory_bytes_before,
+        memory_bytes_after=parsed_excel.memory_bytes_after,
+        reader_engine=parsed_excel.reader_engine,
+        read_seconds=parsed_excel.read_seconds,
     )
 
 
@@ -410,11 +521,16 @@ async def analyze(request: AnalyzeRequest) -> AnalyzeResponse:
 async def analyze_preprocess(request: PreprocessRequest) -> PreprocessResponse:
     """通用表格预处理节点：先按唯一值做定位/数值候选拆分，供分析链路复用。"""
     try:
-        low_cols, high_cols = parse_table_columns(
+        breakdown = breakdown_table_columns_file(
             file_path=request.file_path,
             threshold=request.threshold,
             sheet_name=request.sheet_name,
         )
     except Exception as exc:
         raise HTTPException(status_code=400, detail=f"表格预处理失败: {exc}")
-    return PreprocessResponse(location_columns=low_cols, value_columns=high_cols)
+    return PreprocessResponse(
+        location_columns=breakdown.location_columns,
+        value_columns=breakdown.value_columns,
+        null_like_counts=breakdown.null_like_counts,
+        unique_counts=breakdown.unique_counts,
+    )
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.excel_cache import PARSED_EXCEL_CACHE, load_excel_uncached, make_cache_key
+from src.excel_parser import SAMPLE_INDEX_COLUMN, ParsedExcel, sample_index_dates
+
+# 合并多文件时标记每行来源（批次/lot）的列名。
+SOURCE_COLUMN = "source_file"
+
+_LoadArgs = Tuple[str, Optional[str], Optional[str], bool, bool]
+
+
+def _load_one(args: _LoadArgs) -> ParsedExcel:
+    """进程池中执行：快照优先，否则完整解析（子进程没有父进程的内存缓存）。"""
+    path, preferred_sheet, config_path, use_llm_structure, has_time_column = args
+    return load_excel_uncached(path, preferred_sheet, config_path, use_llm_structure, has_time_column)
+
+
+def _source_labels(paths: Sequence[str]) -> List[str]:
+    """以文件名（不含扩展名）作为来源标签，重名时追加序号。"""
+    labels: List[str] = []
+    seen: Dict[str, int] = {}
+    for path in paths:
+        label = Path(path).stem
+        if label in seen:
+            seen[label] += 1
+            label = f"{label}#{seen[label]}"
+        else:
+            seen[label] = 0
+        labels.append(label)
+    return labels
+
+
+def _column_array(part: ParsedExcel, col: str, kind: str) -> np.ndarray:
+    n = len(part.df)
+    if col not in part.df.columns:
+        if kind == "numeric":
+            return np.full(n, np.nan, dtype=np.float64)
+        return np.full(n, None, dtype=object)
+    series = part.df[col]
+    if kind == "numeric":
+        return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return series.to_numpy(dtype=object)
+
+
+def concat_parsed(
+    parts: Sequence[ParsedExcel],
+    labels: Sequence[str],
+    source_column: str = SOURCE_COLUMN,
+) -> ParsedExcel:
+    """按共享结构对齐并纵向拼接多个 ParsedExcel，追加来源列。
+
+    日期列统一为第一个文件识别出的日期列名；指标列/定位列取各文件并集（按首次出现顺序），
+    缺失列以 NaN/None 填充；同一列在某文件为指标、另一文件为定位列时按指标处理。
+    每个输出列只做一次 np.concatenate，来源列以分类编码存储，不复制标签字符串。
+    未被识别为日期/指标/定位的文本列不保留。
+    """
+    if not parts:
+        raise ValueError("没有可合并的文件")
+    first = parts[0]
+    date_col = first.date_column
+
+    numeric_cols: List[str] = []
+    location_cols: List[str] = []
+    units: Dict[str, str] = {}
+    display_names: Dict[str, str] = {}
+    for part in parts:
+        numeric_cols.extend(c for c in part.numeric_columns if c not in numeric_cols and c != date_col)
+        for col, unit in part.units.items():
+            units.setdefault(col, unit)
+        for col, name in part.column_display_names.items():
+            display_names.setdefault(col, name)
+    numeric_set = set(numeric_cols)
+    for part in parts:
+        location_cols.extend(
+            c for c in part.location_columns if c not in location_cols and c not in numeric_set and c != date_col
+        )
+    if source_column in numeric_set or source_column in location_cols or source_column == date_col:
+        raise ValueError(f"来源列名 {source_column} 与数据列冲突")
+
+    lengths = [len(part.df) for part in parts]
+    total = int(sum(lengths))
+    data: Dict[str, object] = {}
+    if date_col == SAMPLE_INDEX_COLUMN:
+        data[date_col] = np.asarray(sample_index_dates(total), dtype="datetime64[ns]")
+    else:
+        data[date_col] = np.concatenate(
+            [part.df[part.date_column].to_numpy(dtype="datetime64[ns]") for part in parts]
+        )
+    for col in numeric_cols:
+        data[col] = np.concatenate([_column_array(part, col, "numeric") for part in parts])
+    for col in location_cols:
+        data[col] = np.concatenate([_column_array(part, col, "location") for part in parts])
+    codes = np.repeat(np.arange(len(parts), dtype=np.int32), lengths)
+    data[source_column] = pd.Categorical.from_codes(codes, categories=list(labels))
+
+    columns = [date_col] + numeric_cols + location_cols + [source_column]
+    df = pd.DataFrame(data, columns=columns, copy=False)
+    return ParsedExcel(
+        sheet_name=first.sheet_name,
+        df=df,
+        date_column=date_col,
+        numeric_columns=numeric_cols,
+        available_sheets=list(first.available_sheets),
+        units={c: u for c, u in units.items() if c in numeric_set},
+        column_display_names={c: n for c, n in display_names.items() if c in numeric_set},
+        location_columns=location_cols + [source_column],
+    )
+
+
+def load_excel_many(
+    paths: Sequence[str],
+    preferred_sheet: Optional[str] = None,
+    config_path: Optional[str] = None,
+    use_llm_structure: bool = False,
+    has_time_column: bool = True,
+    max_workers: Optional[int] = None,
+    source_column: str = SOURCE_COLUMN,
+) -> ParsedExcel:
+    """多文件（如一批次一个工作簿）合并为一个数据集。
+
+    已在进程缓存中的文件直接复用；其余文件在进程池中并行解析（max_workers 默认取 CPU 数），
+    解析结果写回进程缓存，随后按共享结构对齐拼接并打上来源标签。
+    """
+    paths = list(paths)
+    if not paths:
+        raise ValueError("请至少提供一个数据文件")
+
+    results: List[Optional[ParsedExcel]] = []
+    keys = []
+    missing: List[int] = []
+    for i, path in enumerate(paths):
+        key = make_cache_key(path, preferred_sheet, use_llm_structure, has_time_column)
+        keys.append(key)
+        cached = PARSED_EXCEL_CACHE.get(key)
+        results.append(cached)
+        if cached is None:
+            missing.append(i)
+
+    if missing:
+        args = [(paths[i], preferred_sheet, config_path, use_llm_structure, has_time_column) for i in missing]
+        workers = min(len(missing), max_workers or os.cpu_count() or 1)
+        if workers <= 1:
+            loaded = [_load_one(a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                loaded = list(pool.map(_load_one, args))
+        for i, parsed in zip(missing, loaded):
+            results[i] = parsed
+            PARSED_EXCEL_CACHE.put(keys[i], parsed)
+
+    return concat_parsed([r for r in results if r is not None], _source_labels(paths), source_column)
@@ -13,8 +13,9 @@ from docx.oxml.table import CT_Tbl
 from docx.table import Table
 from docx.text.paragraph import Paragraph
 
-from src.analysis import compute_stats
+from src.batch_stats import compute_stats_batch
 from src.docx_chart import CHART_PLACEHOLDER_PREFIX, inject_editable_charts
+from src.group_stats import GROUP_STAT_KEYS, GroupStatsTable, top_bottom_groups
 from src.llm_client import generate_summary, infer_metric_unit
 
 # 统计项显示：中文 (英文)
@@ -36,6 +37,9 @@ STAT_LABELS: Dict[str, str] = {
     "drift_slope": "漂移斜率 (drift_slope)",
 }
 
+# 分组统计表每个层级最多展示的组数（超出时取均值最高/最低各一半）
+GROUP_TABLE_LIMIT = 10
+
 # 报告字体：英文 Times New Roman，汉字 宋体
 FONT_LATIN = "Times New Roman"
 FONT_EAST_ASIA = "宋体"
@@ -109,6 +113,32 @@ def _chart_categories_and_values(
     return categories, values
 
 
+def _add_group_tables(document: Document, metric: str, group_tables: List[GroupStatsTable]) -> None:
+    """追加单个指标按 lot / wafer 等定位列的分组统计表。"""
+    for group_table in group_tables:
+        if metric not in group_table.table.columns.get_level_values(0):
+            continue
+        shown = top_bottom_groups(group_table.metric_table(metric), GROUP_TABLE_LIMIT)
+        if shown is None:
+            continue
+        note = f"按 {group_table.label} 分组（共 {group_table.group_count} 组"
+        if len(shown) < group_table.group_count:
+            note += f"，展示均值最高与最低各 {len(shown) // 2} 组"
+        document.add_paragraph(note + "）")
+        table = document.add_table(rows=1, cols=len(GROUP_STAT_KEYS) + 1)
+        table.style = "Light Grid"
+        hdr_cells = table.rows[0].cells
+        hdr_cells[0].text = "分组"
+        for j, key in enumerate(GROUP_STAT_KEYS, start=1):
+            hdr_cells[j].text = STAT_LABELS.get(key, key)
+        for key, row in shown.iterrows():
+            row_cells = table.add_row().cells
+            row_cells[0].text = " / ".join(map(str, key)) if isinstance(key, tuple) else str(key)
+            for j, stat in enumerate(GROUP_STAT_KEYS, start=1):
+                value = row[stat]
+                row_cells[j].text = str(int(value)) if stat == "count" else _format_number(float(value))
+
+
 def _add_metrics_section(
     document: Document,
     date_range: str,
@@ -119,18 +149,30 @@ def _add_metrics_section(
     units: Dict[str, str],
     chart_start_index: int,
     preface: Optional[str] = None,
+    stats_by_metric: Optional[Dict[str, Dict[str, float]]] = None,
+    chart_by_metric: Optional[Dict[str, Tuple[List[str], List[float]]]] = None,
+    group_tables: Optional[List[GroupStatsTable]] = None,
 ) -> List[Tuple[List[str], List[float], str, Optional[str]]]:
-    """向 document 追加「日期范围 + 各指标表格/占位符/结论」，返回本节的 chart_data。"""
+    """向 document 追加「日期范围 + 各指标表格/占位符/结论」，返回本节的 chart_data。
+
+    stats_by_metric / chart_by_metric 为调用方预先算好的统计量与图表数据（如 stats_memo 的缓存结果）；
+    缺少的指标按 df 计算。group_tables 为 src.group_stats 的分组统计结果，有则在各指标后追加分组表。
+    """
     chart_data: List[Tuple[List[str], List[float], str, Optional[str]]] = []
     document.add_paragraph(f"日期范围: {date_range}")
     document.add_paragraph(f"指标数量: {len(metrics)}")
     if preface:
         document.add_paragraph(preface)
 
+    # 所有指标的统计量一次批量算出（结果与逐列 compute_stats 一致）
+    stats_by_metric = dict(stats_by_metric or {})
+    missing = [m for m in metrics if m not in stats_by_metric]
+    if missing:
+        stats_by_metric.update(compute_stats_batch(df, missing, date_col))
     for i, metric in enumerate(metrics):
         document.add_heading(metric, level=2)
         series_df = df[[date_col, metric]].dropna()
-        stats = compute_stats(series_df[metric])
+        stats = stats_by_metric[metric]
 
         table = document.add_table(rows=1, cols=2)
         table.style = "Light Grid"
@@ -144,7 +186,10 @@ def _add_metrics_section(
 
         placeholder_idx = chart_start_index + i
         document.add_paragraph(f"{CHART_PLACEHOLDER_PREFIX}{placeholder_idx}")
-        categories, vals = _chart_categories_and_values(series_df, date_col, metric)
+        if chart_by_metric and metric in chart_by_metric:
+            categories, vals = chart_by_metric[metric]
+        else:
+            categories, vals = _chart_categories_and_values(series_df, date_col, metric)
         excel_unit = units.get(metric) or None
         try:
             unit = infer_metric_unit(config_path, str(metric), excel_unit=excel_unit)
@@ -158,6 +203,9 @@ def _add_metrics_section(
         except Exception as exc:
             document.add_paragraph(f"结论生成失败: {exc}")
 
+        if group_tables:
+            _add_group_tables(document, metric, group_tables)
+
     return chart_data
 
 
@@ -172,6 +220,9 @@ def build_report(
     units: Dict[str, str],
     output_path: Optional[str] = None,
     preface: Optional[str] = None,
+    stats_by_metric: Optional[Dict[str, Dict[str, float]]] = None,
+    chart_by_metric: Optional[Dict[str, Tuple[List[str], List[float]]]] = None,
+    group_tables: Optional[List[GroupStatsTable]] = None,
 ) -> Tuple[str, List[Tuple[List[str], List[float], str, Optional[str]]]]:
     """生成新报告，返回 (docx 路径, chart_data)。若提供 output_path 则直接写入该路径（用于多轮共用同一文件）。"""
     os.makedirs(output_dir, exist_ok=True)
@@ -183,7 +234,18 @@ def build_report(
     document = Document()
     document.add_heading(title, level=1)
     chart_data = _add_metrics_section(
-        document, date_range, metrics, df, date_col, config_path, units, chart_start_index=0, preface=preface
+        document,
+        date_range,
+        metrics,
+        df,
+        date_col,
+        config_path,
+        units,
+        chart_start_index=0,
+        preface=preface,
+        stats_by_metric=stats_by_metric,
+        chart_by_metric=chart_by_metric,
+        group_tables=group_tables,
     )
 
     _apply_document_fonts(document)
@@ -207,12 +269,26 @@ def append_report_section(
     units: Dict[str, str],
     chart_start_index: int,
     preface: Optional[str] = None,
+    stats_by_metric: Optional[Dict[str, Dict[str, float]]] = None,
+    chart_by_metric: Optional[Dict[str, Tuple[List[str], List[float]]]] = None,
+    group_tables: Optional[List[GroupStatsTable]] = None,
 ) -> List[Tuple[List[str], List[float], str, Optional[str]]]:
     """向已有 docx 追加一节（多轮对话的一轮），占位符从 chart_start_index 起。返回本节 chart_data。"""
     document = Document(doc_path)
     document.add_heading(section_title, level=1)
     chart_data = _add_metrics_section(
-        document, date_range, metrics, df, date_col, config_path, units, chart_start_index, preface=preface
+        document,
+        date_range,
+        metrics,
+        df,
+        date_col,
+        config_path,
+        units,
+        chart_start_index,
+        preface=preface,
+        stats_by_metric=stats_by_metric,
+        chart_by_metric=chart_by_metric,
+        group_tables=group_tables,
     )
     _apply_document_fonts(document)
     document.save(doc_path)
@@ -19,3 +19,63 @@ def get_output_dir() -> str:
     """返回报告输出目录，支持环境变量覆盖。"""
     configured = os.environ.get("DATA_ANALYSIS_OUTPUT_DIR")
     return configured.strip() if configured and configured.strip() else str(DEFAULT_OUTPUT_DIR)
+
+
+def get_parsed_cache_max_mb() -> int:
+    """返回已解析工作簿 LRU 缓存的内存上限（MB），支持环境变量覆盖；0 表示禁用缓存。"""
+    configured = os.environ.get("DATA_ANALYSIS_PARSED_CACHE_MB")
+    try:
+        return max(0, int(configured)) if configured and configured.strip() else 512
+    except ValueError:
+        return 512
+
+
+def get_snapshot_dir() -> str:
+    """返回列式快照目录（默认与报告目录同级的 data/snapshots）；环境变量设为 off 时禁用快照。"""
+    configured = os.environ.get("DATA_ANALYSIS_SNAPSHOT_DIR")
+    if configured and configured.strip():
+        value = configured.strip()
+        return "" if value.lower() in {"off", "none", "0"} else value
+    return str(Path(get_output_dir()).parent / "snapshots")
+
+
+def get_structure_cache_dir() -> str:
+    """返回 LLM 表结构识别结果的磁盘缓存目录（默认 data/structure_cache）；设为 off 时禁用。"""
+    configured = os.environ.get("DATA_ANALYSIS_STRUCTURE_CACHE_DIR")
+    if configured and configured.strip():
+        value = configured.strip()
+        return "" if value.lower() in {"off", "none", "0"} else value
+    return str(Path(get_output_dir()).parent / "structure_cache")
+
+
+def get_structure_cache_max_entries() -> int:
+    """返回 LLM 表结构缓存的条目上限（默认 500），超出时淘汰最久未使用的条目。"""
+    configured = os.environ.get("DATA_ANALYSIS_STRUCTURE_CACHE_MAX")
+    try:
+        return max(1, int(configured)) if configured and configured.strip() else 500
+    except ValueError:
+        return 500
+
+
+def get_stats_memo_max_entries() -> int:
+    """返回统计/图表数据记忆化缓存的条目上限（默认 512，0 为禁用）。"""
+    configured = os.environ.get("DATA_ANALYSIS_STATS_MEMO_MAX")
+    try:
+        return max(0, int(configured)) if configured and configured.strip() else 512
+    except ValueError:
+        return 512
+
+
+def get_excel_engine() -> str:
+    """返回 Excel 读取引擎（auto/openpyxl/openpyxl_stream/calamine/xlrd），默认 auto 按文件大小与维度自动选择。"""
+    configured = os.environ.get("DATA_ANALYSIS_EXCEL_ENGINE")
+    return configured.strip().lower() if configured and configured.strip() else "auto"
+
+
+def get_stream_load_threshold_mb() -> int:
+    """返回改用流式分块读取的 .xlsx 文件大小阈值（MB，默认 100，0 为禁用）。"""
+    configured = os.environ.get("DATA_ANALYSIS_STREAM_LOAD_MB")
+    try:
+        return max(0, int(configured)) if configured and configured.strip() else 100
+    except ValueError:
+        return 100
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+import pandas as pd
+
+from src.excel_parser import ParsedExcel
+
+# 快照格式版本：ParsedExcel 字段或归一化逻辑变化时递增，旧快照自动失效。
+SNAPSHOT_VERSION = 2
+_META_KEY = b"data_analysis_snapshot"
+_HASH_CHUNK_BYTES = 4 * 1024 * 1024
+
+
+def file_content_hash(path: str) -> str:
+    """按文件内容计算摘要（与路径、mtime 无关），用作快照键。"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(_HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_path(
+    snapshot_dir: str,
+    content_hash: str,
+    sheet_name: Optional[str],
+    use_llm_structure: bool,
+    has_time_column: bool,
+) -> str:
+    """快照文件路径：内容摘要 + 解析参数 + 版本号共同决定，任一变化都会落到新文件。"""
+    key_text = f"{content_hash}|{sheet_name or ''}|{int(use_llm_structure)}|{int(has_time_column)}"
+    key = hashlib.blake2b(key_text.encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(snapshot_dir, f"{key}.v{SNAPSHOT_VERSION}.arrow")
+
+
+def _snapshot_safe(df: pd.DataFrame) -> bool:
+    """能否原样往返 Arrow：列名为互不相同的字符串、默认行索引、且没有 object 列。
+
+    object 列多为数字与文本混排，Arrow 只能存成文本，读回后类型与重新解析的结果不同，这类数据集不写快照。
+    """
+    if not all(isinstance(c, str) for c in df.columns) or not df.columns.is_unique:
+        return False
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        return False
+    return not any(dtype == object for dtype in df.dtypes)
+
+
+def save_snapshot(parsed: ParsedExcel, path: str) -> bool:
+    """将归一化后的 ParsedExcel 写为未压缩 Arrow IPC 文件（可直接内存映射）。失败或不宜快照时返回 False。"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return False
+
+    try:
+        if not _snapshot_safe(parsed.df):
+            return False
+        table = pa.Table.from_pandas(parsed.df, preserve_index=False)
+        meta = {
+            "version": SNAPSHOT_VERSION,
+            "sheet_name": parsed.sheet_name,
+            "date_column": parsed.date_column,
+            "numeric_columns": parsed.numeric_columns,
+            "available_sheets": parsed.available_sheets,
+            "units": parsed.units,
+            "column_display_names": parsed.column_display_names,
+            "location_columns": parsed.location_columns,
+        }
+        schema_meta = dict(table.schema.metadata or {})
+        schema_meta[_META_KEY] = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        table = table.replace_schema_metadata(schema_meta)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return True
+    except Exception:
+        try:
+            os.remove(f"{path}.{os.getpid()}.tmp")
+        except OSError:
+            pass
+        return False
+
+
+def load_snapshot(path: str) -> Optional[ParsedExcel]:
+    """内存映射读取快照；文件缺失、版本不符或损坏时返回 None，由调用方回退到完整解析。"""
+    if not os.path.isfile(path):
+        return None
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+
+    started = time.perf_counter()
+    try:
+        source = pa.memory_map(path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        raw_meta = (table.schema.metadata or {}).get(_META_KEY)
+        if not raw_meta:
+            return None
+        meta = json.loads(raw_meta.decode("utf-8"))
+        if meta.get("version") != SNAPSHOT_VERSION:
+            return None
+        # split_blocks 避免合并成二维块，数值列可直接引用映射内存而不复制。
+        df = table.to_pandas(split_blocks=True)
+    except Exception:
+        return None
+
+    return ParsedExcel(
+        sheet_name=meta["sheet_name"],
+        df=df,
+        date_column=meta["date_column"],
+        numeric_columns=list(meta.get("numeric_columns") or []),
+        available_sheets=list(meta.get("available_sheets") or []),
+        units=dict(meta.get("units") or {}),
+        column_display_names=dict(meta.get("column_display_names") or {}),
+        location_columns=list(meta.get("location_columns") or []),
+        reader_engine="arrow_snapshot",
+        read_seconds=time.perf_counter() - started,
+    )
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.batch_stats import compute_stats_batch
+from src.excel_parser import ParsedExcel
+from src.report_docx import _chart_categories_and_values
+from src.settings import get_stats_memo_max_entries
+from src.time_index import TimeIndex, TimeLike, time_index_for
+from src.window_stats import window_stats
+
+ChartData = Tuple[List[str], List[float]]
+
+
+class StatsMemo:
+    """进程级统计/图表数据记忆化缓存（按条数 LRU），API 与 WebUI 共享。
+
+    键为 (类别, 日期列内容指纹, 指标列内容指纹, 窗口起止, has_time_column)，
+    同一数据内容即使被重新加载（快照、投影加载）也能命中。
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+STATS_MEMO = StatsMemo(max_entries=get_stats_memo_max_entries())
+
+
+def _fingerprint(series: pd.Series, column: str) -> str:
+    values = series.to_numpy()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{column}\x00{series.dtype}".encode("utf-8"))
+    if values.dtype.kind in "biufcmM":
+        digest.update(np.ascontiguousarray(values).view(np.uint8))
+    else:
+        digest.update(pd.util.hash_pandas_object(series, index=False).to_numpy().view(np.uint8))
+    return digest.hexdigest()
+
+
+def column_fingerprint(index: TimeIndex, column: str) -> str:
+    """列内容指纹（列名 + dtype + 数据字节），每个数据集每列只计算一次。"""
+    return index.derived("column_hash", column, lambda: _fingerprint(index.source[column], column))
+
+
+def _window_bound(value: Optional[TimeLike]) -> Optional[int]:
+    return None if value is None else int(pd.Timestamp(value).value)
+
+
+def _keys(
+    kind: str,
+    parsed: ParsedExcel,
+    metrics: Sequence[str],
+    start: Optional[TimeLike],
+    end: Optional[TimeLike],
+    has_time_column: bool,
+) -> Dict[str, Tuple]:
+    index = time_index_for(parsed)
+    date_fp = column_fingerprint(index, parsed.date_column)
+    window = (_window_bound(start), _window_bound(end), bool(has_time_column))
+    return {m: (kind, date_fp, column_fingerprint(index, m)) + window for m in metrics}
+
+
+def memoized_window_stats(
+    parsed: ParsedExcel,
+    metrics: Sequence[str],
+    start: Optional[TimeLike],
+    end: Optional[TimeLike],
+    has_time_column: bool = True,
+) -> Dict[str, Dict[str, float]]:
+    """窗口统计（见 window_stats）；无时间列模式 start/end 传 None，按全部样本统计。"""
+    metrics = list(dict.fromkeys(metrics))
+    keys = _keys("stats", parsed, metrics, start, end, has_time_column)
+    results: Dict[str, Dict[str, float]] = {}
+    missing: List[str] = []
+    for metric in metrics:
+        cached = STATS_MEMO.get(keys[metric])
+        if cached is None:
+            missing.append(metric)
+        else:
+            results[metric] = dict(cached)
+    if missing:
+        if has_time_column and start is not None and end is not None:
+            computed = window_stats(parsed, missing, start, end)
+        else:
+            computed = compute_stats_batch(parsed.df, missing, parsed.date_column)
+        for metric, stats in computed.items():
+            STATS_MEMO.put(keys[metric], dict(stats))
+            results[metric] = stats
+    return {metric: results[metric] for metric in metrics}
+
+
+def memoized_chart_data(
+    parsed: ParsedExcel,
+    frame: pd.DataFrame,
+    metrics: Sequence[str],
+    start: Optional[TimeLike],
+    end: Optional[TimeLike],
+    has_time_column: bool = True,
+) -> Dict[str, ChartData]:
+    """报告图表的横轴分类与数值；frame 为与 (start, end) 对应的窗口数据。"""
+    metrics = list(dict.fromkeys(metrics))
+    keys = _keys("chart", parsed, metrics, start, end, has_time_column)
+    date_col = parsed.date_column
+    results: Dict[str, ChartData] = {}
+    for metric in metrics:
+        cached = STATS_MEMO.get(keys[metric])
+        if cached is None:
+            cached = _chart_categories_and_values(frame[[date_col, metric]].dropna(), date_col, metric)
+            STATS_MEMO.put(keys[metric], cached)
+        categories, values = cached
+        results[metric] = (list(categories), list(values))
+    return results
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.batch_stats import STAT_KEYS
+from src.excel_stream import DEFAULT_CHUNK_ROWS, ColumnChunk, StreamSchema, iter_excel_chunks
+
+# KLL 草图第 0 层容量；越大分位数越准（秩误差约 1.7/k），内存 O(k)。
+DEFAULT_SKETCH_K = 200
+# 各层容量按该比例自顶向下递减（KLL 论文推荐 2/3）。
+_LEVEL_DECAY = 2.0 / 3.0
+_MIN_LEVEL_CAPACITY = 8
+
+
+@dataclass
+class QuantileSketch:
+    """可合并的 KLL 风格分位数草图。
+
+    第 h 层的每个样本代表 2^h 个原始值；某层超出容量时排序并隔一取一提升到上一层。
+    未发生压缩时保留全部原始值，分位数与 np.quantile 完全一致。
+    """
+
+    k: int = DEFAULT_SKETCH_K
+    levels: List[np.ndarray] = field(default_factory=list)
+    n: int = 0
+    # 压缩时交替取奇/偶位置，保证结果可复现且无系统性偏差
+    _coin: int = 0
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(_MIN_LEVEL_CAPACITY, int(math.ceil(self.k * _LEVEL_DECAY ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[: len(items) - len(keep)]
+                promoted = pairs[self._coin :: 2]
+                self._coin ^= 1
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(promoted)
+                else:
+                    self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        if not self.levels:
+            self.levels.append(values.copy())
+        else:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += int(values.size)
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        for level, items in enumerate(other.levels):
+            if level < len(self.levels):
+                self.levels[level] = np.concatenate([self.levels[level], items])
+            else:
+                self.levels.append(items.copy())
+        self.n += other.n
+        self._compress()
+        return self
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) <= 1
+
+    def _weighted(self) -> Tuple[np.ndarray, np.ndarray]:
+        items = np.concatenate(self.levels) if self.levels else np.empty(0)
+        weights = np.concatenate([np.full(len(a), 2.0 ** h) for h, a in enumerate(self.levels)]) if self.levels else np.empty(0)
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """线性插值分位数（与 pandas/numpy 默认 linear 方法同一定义）。"""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.exact:
+            return np.quantile(self.levels[0], qs)
+        items, weights = self._weighted()
+        # 权重为 w 的样本近似占据秩区间的中点
+        positions = np.cumsum(weights) - (weights + 1) / 2
+        return np.interp(qs * (self.n - 1), positions, items)
+
+    def rank(self, value: float) -> float:
+        """严格小于 value 的值所占比例（近似）。"""
+        if self.n == 0:
+            return math.nan
+        total = sum(float(np.count_nonzero(a < value)) * 2.0 ** h for h, a in enumerate(self.levels))
+        return total / self.n
+
+    def rank_above(self, value: float) -> float:
+        """严格大于 value 的值所占比例（近似）。"""
+        if self.n == 0:
+            return math.nan
+        total = sum(float(np.count_nonzero(a > value)) * 2.0 ** h for h, a in enumerate(self.levels))
+        return total / self.n
+
+
+@dataclass
+class StreamingStats:
+    """单个指标的流式统计累加器，统计口径与 compute_stats 相同。
+
+    均值/方差按 Welford（块间按 Chan 公式合并），漂移斜率按「值 ~ 有效样本序号」的
+    中心化协矩累加；合并要求 other 的数据在时间上位于 self 之后（按块顺序合并）。
+    count/mean/min/max/start/end/std/drift_slope 精确（至浮点误差），
+    分位数与 outlier_ratio 在数据量超过草图容量后为近似值。
+    """
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min: float = math.inf
+    max: float = -math.inf
+    start: float = math.nan
+    end: float = math.nan
+    # 样本序号（0..count-1）的均值与方差项、值与序号的协矩
+    x_mean: float = 0.0
+    x_m2: float = 0.0
+    c_xy: float = 0.0
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def _combine(self, n_b: int, mean_b: float, m2_b: float, x_mean_b: float, x_m2_b: float, c_xy_b: float) -> None:
+        n_a = self.count
+        if n_a == 0:
+            self.count, self.mean, self.m2 = n_b, mean_b, m2_b
+            self.x_mean, self.x_m2, self.c_xy = x_mean_b, x_m2_b, c_xy_b
+            return
+        n = n_a + n_b
+        # b 的序号整体平移 n_a（排在 a 之后）
+        x_mean_b += n_a
+        delta_y = mean_b - self.mean
+        delta_x = x_mean_b - self.x_mean
+        self.m2 += m2_b + delta_y * delta_y * n_a * n_b / n
+        self.x_m2 += x_m2_b + delta_x * delta_x * n_a * n_b / n
+        self.c_xy += c_xy_b + delta_x * delta_y * n_a * n_b / n
+        self.mean += delta_y * n_b / n
+        self.x_mean += delta_x * n_b / n
+        self.count = n
+
+    def update(self, values: np.ndarray) -> None:
+        """追加一个数据块（按时间顺序）；NaN 会被忽略。"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        n_b = int(values.size)
+        if n_b == 0:
+            return
+        mean_b = float(values.mean())
+        centered = values - mean_b
+        x = np.arange(n_b, dtype=np.float64)
+        x_mean_b = (n_b - 1) / 2.0
+        x_centered = x - x_mean_b
+        self._combine(
+            n_b,
+            mean_b,
+            float((centered * centered).sum()),
+            x_mean_b,
+            float((x_centered * x_centered).sum()),
+            float((x_centered * centered).sum()),
+        )
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        if math.isnan(self.start):
+            self.start = float(values[0])
+        self.end = float(values[-1])
+        self.sketch.update(values)
+
+    def merge(self, other: "StreamingStats") -> "StreamingStats":
+        """合并另一累加器（其数据位于 self 之后），可跨块、跨进程使用。"""
+        if other.count == 0:
+            return self
+        start = self.start if self.count else other.start
+        self._combine(other.count, other.mean, other.m2, other.x_mean, other.x_m2, other.c_xy)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.start = start
+        self.end = other.end
+        self.sketch.merge(other.sketch)
+        return self
+
+    def quantiles(self, qs: Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> np.ndarray:
+        return self.sketch.quantiles(qs)
+
+    def to_dict(self) -> Dict[str, float]:
+        """输出与 compute_stats 相同键的统计结果。"""
+        if self.count == 0:
+            stats: Dict[str, float] = {key: math.nan for key in STAT_KEYS}
+            stats["count"] = 0
+            return stats
+        p5, q1, median, q3, p95 = (float(v) for v in self.quantiles())
+        std = math.sqrt(max(self.m2, 0.0) / (self.count - 1)) if self.count > 1 else 0.0
+        iqr = q3 - q1
+        if iqr <= 0:
+            outlier_ratio = 0.0
+        else:
+            outlier_ratio = self.sketch.rank(q1 - 1.5 * iqr) + self.sketch.rank_above(q3 + 1.5 * iqr)
+        abs_change = self.end - self.start
+        return {
+            "count": int(self.count),
+            "mean": float(self.mean),
+            "min": float(self.min),
+            "max": float(self.max),
+            "start": float(self.start),
+            "end": float(self.end),
+            "abs_change": float(abs_change),
+            "pct_change": math.nan if self.start == 0 else abs_change / self.start,
+            "median": median,
+            "std": std,
+            "p5": p5,
+            "p95": p95,
+            "cv": math.nan if abs(self.mean) < 1e-12 else std / self.mean,
+            "outlier_ratio": float(outlier_ratio),
+            "drift_slope": float(self.c_xy / self.x_m2) if self.count > 1 and self.x_m2 > 0 else 0.0,
+        }
+
+
+def accumulate_chunks(
+    chunks: Iterable[ColumnChunk],
+    metrics: Sequence[str],
+    date_column: Optional[str] = None,
+    sketch_k: int = DEFAULT_SKETCH_K,
+) -> Dict[str, StreamingStats]:
+    """逐块累加指标统计；给出 date_column 时只统计日期非空的行（与报告的 dropna 口径一致）。"""
+    accumulators = {m: StreamingStats(sketch=QuantileSketch(k=sketch_k)) for m in metrics}
+    for chunk in chunks:
+        row_mask = None
+        if date_column is not None and date_column in chunk:
+            row_mask = ~np.isnat(np.asarray(chunk[date_column], dtype="datetime64[ns]"))
+        for metric, acc in accumulators.items():
+            values = np.asarray(chunk[metric], dtype=np.float64)
+            acc.update(values if row_mask is None else values[row_mask])
+    return accumulators
+
+
+def merge_stats(parts: Sequence[Dict[str, StreamingStats]]) -> Dict[str, StreamingStats]:
+    """按顺序合并多个块/进程的累加结果（先出现的视为时间更早）。"""
+    merged: Dict[str, StreamingStats] = {}
+    for part in parts:
+        for metric, acc in part.items():
+            if metric in merged:
+                merged[metric].merge(acc)
+            else:
+                merged[metric] = acc
+    return merged
+
+
+def stream_excel_stats(
+    path: str,
+    preferred_sheet: Optional[str] = None,
+    has_time_column: bool = True,
+    metrics: Optional[Sequence[str]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    sketch_k: int = DEFAULT_SKETCH_K,
+) -> Tuple[StreamSchema, Dict[str, StreamingStats]]:
+    """流式读取工作簿并只保留统计累加器，不拼装完整数据；内存与块大小及草图容量相关。"""
+    schema, chunks = iter_excel_chunks(path, preferred_sheet, has_time_column=has_time_column, chunk_rows=chunk_rows)
+    selected = [m for m in (metrics or schema.numeric_columns) if m in schema.numeric_columns]
+    return schema, accumulate_chunks(chunks, selected, schema.date_column, sketch_k=sketch_k)
+
+
+def _stream_one(args: Tuple[str, Optional[str], bool, Optional[Sequence[str]], int, int]) -> Dict[str, StreamingStats]:
+    path, preferred_sheet, has_time_column, metrics, chunk_rows, sketch_k = args
+    return stream_excel_stats(path, preferred_sheet, has_time_column, metrics, chunk_rows, sketch_k)[1]
+
+
+def stream_excel_stats_many(
+    paths: Sequence[str],
+    preferred_sheet: Optional[str] = None,
+    has_time_column: bool = True,
+    metrics: Optional[Sequence[str]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    sketch_k: int = DEFAULT_SKETCH_K,
+    max_workers: Optional[int] = None,
+) -> Dict[str, StreamingStats]:
+    """多个按时间先后排列的文件在进程池中各自累加，再按文件顺序合并。"""
+    args = [(p, preferred_sheet, has_time_column, metrics, chunk_rows, sketch_k) for p in paths]
+    workers = min(len(args), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        parts = [_stream_one(a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_stream_one, args))
+    return merge_stats(parts)
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from src.settings import get_structure_cache_dir, get_structure_cache_max_entries
+
+# 提示词或返回结构变化时递增，旧条目自动失效。
+STRUCTURE_CACHE_VERSION = 2
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def schema_fingerprint(df: pd.DataFrame) -> str:
+    """表结构指纹：有序列名 + 推断 dtype；同一模板的不同数据文件得到相同指纹。"""
+    layout = [[str(col), str(dtype)] for col, dtype in zip(df.columns, df.dtypes)]
+    text = json.dumps([STRUCTURE_CACHE_VERSION, layout], ensure_ascii=False)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def _entry_path(cache_dir: str, fingerprint: str) -> str:
+    return os.path.join(cache_dir, f"{fingerprint}.json")
+
+
+def get_structure(fingerprint: str) -> Optional[Dict[str, Any]]:
+    """读取缓存的 LLM 结构结果；命中时刷新 mtime，作为 LRU 淘汰依据。"""
+    cache_dir = get_structure_cache_dir()
+    if not cache_dir:
+        return None
+    path = _entry_path(cache_dir, fingerprint)
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            entry = json.load(handle)
+        result = entry.get("result")
+        if entry.get("version") != STRUCTURE_CACHE_VERSION or not isinstance(result, dict):
+            raise ValueError("stale structure cache entry")
+        os.utime(path, None)
+    except FileNotFoundError:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    except Exception:
+        # 损坏或旧版本条目直接丢弃
+        invalidate(fingerprint)
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    with _lock:
+        _stats["hits"] += 1
+    return result
+
+
+def put_structure(fingerprint: str, columns: List[str], result: Dict[str, Any]) -> None:
+    """写入 LLM 结构结果（原子替换），随后按条目上限淘汰最久未使用的条目。"""
+    cache_dir = get_structure_cache_dir()
+    if not cache_dir:
+        return
+    entry = {
+        "version": STRUCTURE_CACHE_VERSION,
+        "created_at": time.time(),
+        "columns": columns,
+        "result": result,
+    }
+    path = _entry_path(cache_dir, fingerprint)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(entry, handle, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return
+    _evict(cache_dir, get_structure_cache_max_entries())
+
+
+def _evict(cache_dir: str, max_entries: int) -> None:
+    try:
+        names = [n for n in os.listdir(cache_dir) if n.endswith(".json")]
+    except OSError:
+        return
+    if len(names) <= max_entries:
+        return
+    paths = [os.path.join(cache_dir, n) for n in names]
+    paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0.0)
+    for path in paths[: len(paths) - max_entries]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def invalidate(fingerprint: Optional[str] = None) -> int:
+    """删除指定指纹的条目；不传指纹时清空整个结构缓存。返回删除的条目数。"""
+    cache_dir = get_structure_cache_dir()
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return 0
+    if fingerprint:
+        names = [f"{fingerprint}.json"]
+    else:
+        names = [n for n in os.listdir(cache_dir) if n.endswith(".json")]
+    removed = 0
+    for name in names:
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def stats() -> Dict[str, int]:
+    cache_dir = get_structure_cache_dir()
+    entries = 0
+    if cache_dir and os.path.isdir(cache_dir):
+        entries = sum(1 for n in os.listdir(cache_dir) if n.endswith(".json"))
+    with _lock:
+        return {"entries": entries, "hits": _stats["hits"], "misses": _stats["misses"]}
@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import pandas as pd
 
+from src.excel_engines import ENGINE_AUTO, read_sheet, select_engine, sheet_dimensions
+
+
+# 去除首尾空白并转小写后视为空值的文本。
+NULL_LIKE_TOKENS = frozenset({"", "null", "none", "nan"})
+# infer_dtype 结果中可能含字符串元素的类型
+_TEXT_INFERRED_TYPES = frozenset({"string", "mixed", "mixed-integer", "empty"})
+
 
 def is_null_like(value) -> bool:
     """判断一个值是否为空值/null。"""
@@ -12,45 +21,147 @@ def is_null_like(value) -> bool:
         return True
     if isinstance(value, str):
         s = value.strip().lower()
-        if s in {"", "null", "none", "nan"}:
+        if s in NULL_LIKE_TOKENS:
             return True
     return False
 
 
-def read_table(file_path: str, sheet_name: str | None = None) -> pd.DataFrame:
-    """根据文件后缀读取通用表格（csv/xlsx/xls）。"""
+# 无工作表概念的平面表格格式。
+FLAT_TABLE_EXTS = frozenset({".csv", ".parquet"})
+
+
+def is_flat_table(file_path: str) -> bool:
+    return Path(file_path).suffix.lower() in FLAT_TABLE_EXTS
+
+
+def _read_csv_c_engine(path: Path, **kwargs) -> pd.DataFrame:
+    """pandas C 引擎读取 CSV；UTF-8 解码失败时按 GB18030 重试（国产测试机导出常见编码）。"""
+    try:
+        return pd.read_csv(path, **kwargs)
+    except UnicodeDecodeError:
+        return pd.read_csv(path, encoding="gb18030", **kwargs)
+
+
+def read_flat_table(
+    file_path: str,
+    columns: Optional[Sequence[str]] = None,
+    nrows: Optional[int] = None,
+) -> pd.DataFrame:
+    """读取 CSV/Parquet，可只读部分列（columns）或前 nrows 行。
+
+    CSV 整表读取走 pyarrow 多线程引擎，失败（未安装、非 UTF-8 等）时回退 C 引擎；
+    pyarrow 引擎不支持 nrows，结构探测时直接用 C 引擎。Parquet 按列读取，nrows 只解码首个批次。
+    """
     path = Path(file_path)
     suffix = path.suffix.lower()
+    usecols = list(columns) if columns is not None else None
 
     if suffix == ".csv":
-        return pd.read_csv(path)
+        if nrows is not None:
+            df, engine = _read_csv_c_engine(path, usecols=usecols, nrows=nrows), "csv_c"
+        else:
+            try:
+                df, engine = pd.read_csv(path, usecols=usecols, engine="pyarrow"), "csv_pyarrow"
+            except Exception:
+                df, engine = _read_csv_c_engine(path, usecols=usecols), "csv_c"
+    elif suffix == ".parquet":
+        engine = "parquet_pyarrow"
+        if nrows is None:
+            df = pd.read_parquet(path, columns=usecols)
+        else:
+            import pyarrow.parquet as pq
+
+            parquet_file = pq.ParquetFile(path)
+            batch = next(parquet_file.iter_batches(batch_size=max(1, nrows), columns=usecols), None)
+            df = (batch if batch is not None else parquet_file.schema_arrow.empty_table()).to_pandas()
+    else:
+        raise ValueError(f"Unsupported file format: {suffix}")
+    # 记录实际读取引擎，供 ParsedExcel.reader_engine 使用。
+    df.attrs["reader_engine"] = engine
+    return df
+
+
+def read_table(file_path: str, sheet_name: str | None = None, engine: str = ENGINE_AUTO) -> pd.DataFrame:
+    """根据文件后缀读取通用表格（csv/parquet/xlsx/xls）；Excel 未指定 sheet 时读取第一个工作表。
+
+    engine 见 excel_engines；auto 时按文件大小与工作表维度自动选择。
+    """
+    path = Path(file_path)
+    suffix = path.suffix.lower()
+
+    if suffix in FLAT_TABLE_EXTS:
+        return read_flat_table(file_path)
     if suffix in {".xlsx", ".xls"}:
-        return pd.read_excel(path, sheet_name=sheet_name)
+        xls = pd.ExcelFile(path)
+        name = sheet_name if sheet_name is not None else xls.sheet_names[0]
+        if engine == ENGINE_AUTO:
+            engine = select_engine(str(path), *sheet_dimensions(xls, name))
+        df, used = read_sheet(str(path), xls, name, engine)
+        df.attrs["reader_engine"] = used
+        return df
     raise ValueError(f"Unsupported file format: {suffix}")
 
 
-def parse_table_columns_from_df(df: pd.DataFrame, threshold: int = 10) -> Tuple[List[str], List[str]]:
-    """按唯一值数量解析列：返回(定位列, 数值列候选)。"""
-    low_cols: List[str] = []
-    high_cols: List[str] = []
+def null_like_mask(series: pd.Series) -> pd.Series:
+    """向量化的 is_null_like：isna，外加仅对文本列做去空白小写后的空值文本匹配。"""
+    mask = series.isna()
+    if not (series.dtype == object or pd.api.types.is_string_dtype(series)):
+        return mask
+    # 只有含字符串的列需要匹配；全为布尔/整数/日期等的 object 列没有 .str 访问器，也不可能命中空值文本。
+    if pd.api.types.infer_dtype(series, skipna=True) not in _TEXT_INFERRED_TYPES:
+        return mask
+    try:
+        # 非字符串元素经 .str 访问后为 NaN，isin 判为 False，与 is_null_like 只检查 str 的口径一致。
+        lowered = series.str.strip().str.lower()
+    except AttributeError:
+        lowered = series.map(lambda v: v.strip().lower() if isinstance(v, str) else None)
+    return mask | lowered.isin(NULL_LIKE_TOKENS).fillna(False).astype(bool)
+
 
+@dataclass
+class ColumnBreakdown:
+    """按唯一值拆分列的完整结果：定位列/数值列候选及每列的空值与唯一值计数。"""
+
+    location_columns: List[str] = field(default_factory=list)
+    value_columns: List[str] = field(default_factory=list)
+    null_like_counts: Dict[str, int] = field(default_factory=dict)
+    unique_counts: Dict[str, int] = field(default_factory=dict)
+
+
+def breakdown_table_columns(df: pd.DataFrame, threshold: int = 10) -> ColumnBreakdown:
+    """含空值类取值的列一律作为数值列候选；其余按唯一值数量 <= threshold 判为定位列。"""
+    result = ColumnBreakdown()
     for col in df.columns:
         series = df[col]
-        if series.map(is_null_like).any():
-            high_cols.append(str(col))
-            continue
-
-        unique_count = series.nunique(dropna=True)
-        if unique_count <= threshold:
-            low_cols.append(str(col))
+        name = str(col)
+        null_like_count = int(null_like_mask(series).sum())
+        unique_count = int(series.nunique(dropna=True))
+        result.null_like_counts[name] = null_like_count
+        result.unique_counts[name] = unique_count
+        if null_like_count > 0 or unique_count > threshold:
+            result.value_columns.append(name)
         else:
-            high_cols.append(str(col))
+            result.location_columns.append(name)
+    return result
 
-    return low_cols, high_cols
 
+def parse_table_columns_from_df(df: pd.DataFrame, threshold: int = 10) -> Tuple[List[str], List[str]]:
+    """按唯一值数量解析列：返回(定位列, 数值列候选)。"""
+    result = breakdown_table_columns(df, threshold=threshold)
+    return result.location_columns, result.value_columns
 
-def parse_table_columns(file_path: str, threshold: int = 10, sheet_name: str | None = None) -> Tuple[List[str], List[str]]:
-    """文件版解析接口，返回(定位列, 数值列候选)。"""
+
+def breakdown_table_columns_file(
+    file_path: str,
+    threshold: int = 10,
+    sheet_name: str | None = None,
+) -> ColumnBreakdown:
+    """文件版完整拆分结果。"""
     df = read_table(file_path=file_path, sheet_name=sheet_name)
-    return parse_table_columns_from_df(df=df, threshold=threshold)
+    return breakdown_table_columns(df=df, threshold=threshold)
+
 
+def parse_table_columns(file_path: str, threshold: int = 10, sheet_name: str | None = None) -> Tuple[List[str], List[str]]:
+    """文件版解析接口，返回(定位列, 数值列候选)。"""
+    result = breakdown_table_columns_file(file_path=file_path, threshold=threshold, sheet_name=sheet_name)
+    return result.location_columns, result.value_columns
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional, Tuple, TypeVar, Union
+
+import numpy as np
+import pandas as pd
+
+from src.excel_parser import ParsedExcel
+
+# 日期列非升序时，每个数据集缓存的窗口行号数组个数（多轮对话中反复出现的「最近一年」等窗口直接复用）。
+# 只缓存行号而非取出的 DataFrame，避免窗口副本游离在 ParsedExcelCache 的内存预算之外。
+_MAX_CACHED_WINDOWS = 8
+
+TimeLike = Union[datetime, pd.Timestamp, np.datetime64, str]
+T = TypeVar("T")
+
+
+class TimeIndex:
+    """数据集日期列的有序索引：窗口查询用二分查找定位行区间，不再整列比较。
+
+    日期列已按时间升序（常见的日志/日报）时窗口为原 df 的零拷贝切片；
+    否则保存一次稳定排序的行号，窗口只取出落在区间内的行，并保持原始行序，
+    与 df[(d >= start) & (d <= end)] 的结果逐行一致。NaT 行不会落入任何窗口。
+    """
+
+    def __init__(self, df: pd.DataFrame, date_column: str) -> None:
+        self.source = df
+        self.date_column = date_column
+        column = df[date_column]
+        if isinstance(column.dtype, pd.DatetimeTZDtype):
+            # 带时区的日期列按 UTC 转为无时区时间；带时区的窗口端点经 to_datetime64 同样落在 UTC
+            column = column.dt.tz_convert(None)
+        values = column.to_numpy()
+        if values.dtype.kind != "M":
+            raise TypeError(f"日期列 {date_column} 不是 datetime 类型")
+        self._unit = np.datetime_data(values.dtype)[0]
+        invalid = np.isnat(values)
+        self.valid_count = int(len(values) - invalid.sum())
+        ints = values.view("i8")
+        if not invalid.any() and (len(ints) < 2 or bool((ints[1:] >= ints[:-1]).all())):
+            self._order: Optional[np.ndarray] = None
+            self._sorted = values
+        else:
+            # NaT 在 numpy 排序中位于末尾，只在前 valid_count 个位置上二分
+            self._order = np.argsort(values, kind="stable")
+            self._sorted = values[self._order]
+        self._lock = threading.Lock()
+        # 依附于本数据集的派生数据（如列内容指纹），按类别分别存放；
+        # 与索引同生命周期，df 替换后随索引一起重建
+        self._derived: Dict[str, "OrderedDict[Hashable, object]"] = {}
+
+    @property
+    def is_sorted(self) -> bool:
+        return self._order is None
+
+    @property
+    def date_min(self) -> pd.Timestamp:
+        return pd.Timestamp(self._sorted[0]) if self.valid_count else pd.NaT
+
+    @property
+    def date_max(self) -> pd.Timestamp:
+        return pd.Timestamp(self._sorted[self.valid_count - 1]) if self.valid_count else pd.NaT
+
+    def _to_datetime64(self, value: TimeLike) -> np.datetime64:
+        return np.datetime64(pd.Timestamp(value).to_datetime64(), self._unit)
+
+    def bounds(self, start: TimeLike, end: TimeLike) -> Tuple[int, int]:
+        """窗口 [start, end]（两端闭区间）在有序日期上的位置区间 [lo, hi)。"""
+        valid = self._sorted[: self.valid_count]
+        lo = int(np.searchsorted(valid, self._to_datetime64(start), side="left"))
+        hi = int(np.searchsorted(valid, self._to_datetime64(end), side="right"))
+        return lo, max(lo, hi)
+
+    def derived(self, kind: str, key: Hashable, build: Callable[[], T], max_entries: Optional[int] = None) -> T:
+        """取 kind 类派生数据中 key 对应的值，未命中时调用 build() 构建并保存。
+
+        build 在锁外执行（并发时可能重复构建，结果相同）；max_entries 为该类别的 LRU 条数上限。
+        """
+        with self._lock:
+            cache = self._derived.setdefault(kind, OrderedDict())
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]  # type: ignore[return-value]
+        value = build()
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            if max_entries is not None:
+                while len(cache) > max_entries:
+                    cache.popitem(last=False)
+        return value
+
+    def window(self, start: TimeLike, end: TimeLike) -> pd.DataFrame:
+        """返回窗口内的行；日期升序时为零拷贝切片，否则按缓存的行号取行。"""
+        lo, hi = self.bounds(start, end)
+        if self._order is None:
+            return self.source.iloc[lo:hi]
+        order = self._order
+        rows = self.derived("window_rows", (lo, hi), lambda: np.sort(order[lo:hi]), max_entries=_MAX_CACHED_WINDOWS)
+        return self.source.take(rows)
+
+def time_index_for(parsed: ParsedExcel) -> TimeIndex:
+    """取数据集的时间索引，首次使用时构建并挂在 ParsedExcel 上随缓存复用；df 被替换（如增量追加）后重建。"""
+    index = parsed.time_index
+    if (
+        not isinstance(index, TimeIndex)
+        or index.source is not parsed.df
+        or index.date_column != parsed.date_column
+    ):
+        index = TimeIndex(parsed.df, parsed.date_column)
+        parsed.time_index = index
+    return index
+
+
+def slice_window(parsed: ParsedExcel, start: TimeLike, end: TimeLike) -> pd.DataFrame:
+    """等价于 df[(df[date_col] >= start) & (df[date_col] <= end)]，按二分查找取行。"""
+    return time_index_for(parsed).window(start, end)
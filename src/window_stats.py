@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import Dict, Sequence
+
+from src.batch_stats import compute_stats_batch
+from src.excel_parser import ParsedExcel
+from src.time_index import TimeLike, time_index_for
+
+
+def window_stats(
+    parsed: ParsedExcel,
+    metrics: Sequence[str],
+    start: TimeLike,
+    end: TimeLike,
+) -> Dict[str, Dict[str, float]]:
+    """任意时间窗口 [start, end] 的指标统计，键与 compute_stats 相同。
+
+    行区间由有序日期索引二分得到（日期升序时为零拷贝切片），统计量对窗口切片调用
+    compute_stats_batch，与 compute_stats 逐位一致。
+    """
+    index = time_index_for(parsed)
+    return compute_stats_batch(index.window(start, end), list(dict.fromkeys(metrics)), index.date_column)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.excel_cache import PARSED_EXCEL_CACHE, load_excel_projected_cached
+from src.excel_parser import SCHEMA_PROBE_ROWS, load_excel
+
+
+@pytest.fixture(autouse=True)
+def _no_snapshots(monkeypatch):
+    monkeypatch.setenv("DATA_ANALYSIS_SNAPSHOT_DIR", "off")
+    PARSED_EXCEL_CACHE.clear()
+    yield
+    PARSED_EXCEL_CACHE.clear()
+
+
+def _write_workbook(path, rows, text_from=None):
+    rng = np.random.default_rng(0)
+    thickness = list(np.round(rng.normal(100, 2, rows), 3))
+    if text_from is not None:
+        thickness[text_from:] = [f"复测-{i}" for i in range(rows - text_from)]
+    pd.DataFrame(
+        {
+            "日期": pd.date_range("2024-01-01", periods=rows, freq="h"),
+            "厚度": thickness,
+            "电阻": np.round(rng.normal(5, 0.1, rows), 4),
+        }
+    ).to_excel(path, index=False)
+
+
+def test_projected_load_keeps_probe_classification(tmp_path):
+    path = str(tmp_path / "ok.xlsx")
+    _write_workbook(path, rows=600)
+
+    parsed = load_excel_projected_cached(path, ["厚度"])
+
+    assert parsed.loaded_columns == ["日期", "厚度"]
+    assert parsed.df["厚度"].notna().all()
+
+
+def test_text_after_probe_rows_falls_back_to_full_load(tmp_path):
+    path = str(tmp_path / "late_text.xlsx")
+    _write_workbook(path, rows=SCHEMA_PROBE_ROWS + 400, text_from=SCHEMA_PROBE_ROWS + 50)
+    full = load_excel(path)
+    assert "厚度" not in full.numeric_columns
+
+    parsed = load_excel_projected_cached(path, ["厚度"])
+
+    assert parsed.loaded_columns is None
+    assert parsed.numeric_columns == full.numeric_columns
+    pd.testing.assert_frame_equal(parsed.df, full.df)
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src import excel_cache
+from src.excel_cache import load_excel_uncached
+from src.excel_parser import load_excel
+from src.snapshot_store import save_snapshot
+
+
+def _write_workbook(path, **extra):
+    df = pd.DataFrame(
+        {
+            "日期": pd.date_range("2024-01-01", periods=6, freq="D"),
+            "良率": [97.1, 97.4, None, 96.8, 97.9, 98.2],
+            "lot": ["L1", "L1", "L2", None, "L3", "L3"],
+            **extra,
+        }
+    )
+    df.to_excel(path, index=False)
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "snapshots"
+    monkeypatch.setenv("DATA_ANALYSIS_SNAPSHOT_DIR", str(directory))
+    return directory
+
+
+def test_snapshot_hit_equals_fresh_load(tmp_path, snapshot_dir):
+    path = str(tmp_path / "data.xlsx")
+    _write_workbook(path)
+
+    fresh = load_excel_uncached(path, None, None, False, True)
+    assert any(snapshot_dir.iterdir())
+    hit = load_excel_uncached(path, None, None, False, True)
+
+    assert hit.reader_engine == "arrow_snapshot"
+    pd.testing.assert_frame_equal(hit.df, fresh.df)
+    assert hit.date_column == fresh.date_column
+    assert hit.numeric_columns == fresh.numeric_columns
+    assert hit.location_columns == fresh.location_columns
+
+
+def test_mixed_object_column_is_not_snapshotted(tmp_path, snapshot_dir):
+    path = str(tmp_path / "mixed.xlsx")
+    _write_workbook(path, 备注=[1, "复测", 2.5, None, "OK", 3])
+
+    parsed = load_excel(path)
+    assert parsed.df["备注"].dtype == object
+    assert not save_snapshot(parsed, str(tmp_path / "mixed.arrow"))
+
+    load_excel_uncached(path, None, None, False, True)
+    again = load_excel_uncached(path, None, None, False, True)
+    assert again.reader_engine != "arrow_snapshot"
+    pd.testing.assert_frame_equal(again.df, parsed.df)
+
+
+def test_content_hash_is_memoized_per_file_version(tmp_path, snapshot_dir, monkeypatch):
+    path = str(tmp_path / "data.xlsx")
+    _write_workbook(path)
+    calls = []
+    real_hash = excel_cache.file_content_hash
+    monkeypatch.setattr(excel_cache, "file_content_hash", lambda p: calls.append(p) or real_hash(p))
+
+    first = excel_cache._content_hash(path)
+    assert excel_cache._content_hash(path) == first
+    assert len(calls) == 1
+
+    _write_workbook(path, 备注=["a"] * 6)
+    assert excel_cache._content_hash(path) != first
+    assert len(calls) == 2